@@ -0,0 +1,36 @@
+"""Add owner and composite indexes for hot queries
+
+Revision ID: b41c7d2e9f13
+Revises: ecf1d6488742
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41c7d2e9f13'
+down_revision: Union[str, Sequence[str], None] = 'ecf1d6488742'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_analytics_owner_event', 'analytics', ['owner_id', 'event_type'], unique=False)
+    op.create_index('ix_chat_history_owner_session_ts', 'chat_history', ['owner_id', 'session_id', 'timestamp'], unique=False)
+    op.create_index('ix_memory_embeddings_owner_id', 'memory_embeddings', ['owner_id'], unique=False)
+    op.create_index('ix_prompts_owner_id', 'prompts', ['owner_id'], unique=False)
+    op.create_index('ix_templates_owner_id', 'templates', ['owner_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_templates_owner_id', table_name='templates')
+    op.drop_index('ix_prompts_owner_id', table_name='prompts')
+    op.drop_index('ix_memory_embeddings_owner_id', table_name='memory_embeddings')
+    op.drop_index('ix_chat_history_owner_session_ts', table_name='chat_history')
+    op.drop_index('ix_analytics_owner_event', table_name='analytics')
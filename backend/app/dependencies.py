@@ -1,8 +1,11 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models, database, auth
+from app.services.principal_cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
@@ -13,26 +16,66 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+# Read-only session for reporting queries; same as get_db unless DB_READ_ENGINE=1
+def get_read_db():
+    db = database.ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# ✅ Async sessions (aiosqlite/asyncpg) for routes that run on the event loop
+async def get_async_db():
+    async with database.async_session_factory()() as db:
+        yield db
+
+async def get_async_read_db():
+    async with database.async_session_factory(read_only=True)() as db:
+        yield db
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def _decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
+        if payload.get("sub") is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    return payload
+
+# Both variants consult the principal cache first, so a repeat token costs no JWT decode or query.
+# Users served from the cache are transient; load them into a session before modifying them.
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+    payload = _decode_token(token)
+    user = db.query(models.User).filter(models.User.username == payload["sub"]).first()
+    if user is None:
+        raise credentials_exception
+    principal_cache.put(token, user, payload.get("exp"))
+    return user
 
-    user = db.query(models.User).filter(models.User.username == username).first()
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+    payload = _decode_token(token)
+    user = await db.scalar(select(models.User).where(models.User.username == payload["sub"]))
     if user is None:
         raise credentials_exception
+    principal_cache.put(token, user, payload.get("exp"))
     return user
 
 # ✅ Generic RBAC checker (supports any number of roles)
@@ -14,9 +14,14 @@ from app.routes import (
     integration,
     docs,
     user,
-    chat_history
+    chat_history,
+    metrics
 )
 from app.database import SessionLocal
+from app.services import memory_service
+from app.services.model_registry import registry, MODEL_WARMUP
+from app.services.retrieval_executor import retrieval_executor
+from app.services.persistence_queue import persistence_queue
 from fastapi.staticfiles import StaticFiles
 import os
 
@@ -35,13 +40,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Context-Tokens"],
 )
 
 @app.on_event("startup")
 async def startup_event():
     db = SessionLocal()
-    # No need to initialize index unless you are persisting it
-    db.close()
+    try:
+        # Warm-load the semantic memory snapshot so existing faiss_ids resolve again
+        memory_service.load_index(db)
+    finally:
+        db.close()
+
+    # Models load on first use; optionally start loading them now without blocking startup
+    if MODEL_WARMUP:
+        registry.warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await generate.groq_client.aclose()
+    retrieval_executor.shutdown()
+    await database.dispose_async_engines()
+    # Flush buffered generation records before the worker exits
+    persistence_queue.stop()
 
 app.mount(
     "/static",
@@ -61,6 +82,7 @@ app.include_router(integration.router)
 app.include_router(docs.router)
 app.include_router(user.router)
 app.include_router(chat_history.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def read_root():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Float, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -27,6 +27,7 @@ class User(Base):
 
 class Template(Base):
     __tablename__ = "templates"
+    __table_args__ = (Index("ix_templates_owner_id", "owner_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
@@ -38,6 +39,7 @@ class Template(Base):
 
 class Prompt(Base):
     __tablename__ = "prompts"
+    __table_args__ = (Index("ix_prompts_owner_id", "owner_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     text = Column(String, nullable=False)
@@ -48,6 +50,8 @@ class Prompt(Base):
 
 class Analytics(Base):
     __tablename__ = "analytics"
+    # The single-pass dashboard aggregate and the export both range over the owner's rows
+    __table_args__ = (Index("ix_analytics_owner_event", "owner_id", "event_type"),)
 
     id = Column(Integer, primary_key=True, index=True)
     event_type = Column(String, nullable=False)
@@ -87,6 +91,7 @@ class GeneratedContent(Base):
 
 class MemoryEmbedding(Base):
     __tablename__ = "memory_embeddings"
+    __table_args__ = (Index("ix_memory_embeddings_owner_id", "owner_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     faiss_id = Column(Integer, unique=True, index=True)
@@ -98,6 +103,8 @@ class MemoryEmbedding(Base):
 
 class ChatHistory(Base):
     __tablename__ = "chat_history"
+    # Serves session lists, per-session history in time order, and buffer rehydration
+    __table_args__ = (Index("ix_chat_history_owner_session_ts", "owner_id", "session_id", "timestamp"),)
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, nullable=False)  # Added session ID for chat tabs
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from app import models, dependencies
+from app.services.analytics_dashboard import dashboard_statement, dashboard_from_row, dashboard_cache
 import csv
 from io import StringIO, BytesIO
 from fpdf import FPDF
@@ -10,75 +12,33 @@ from fpdf import FPDF
 router = APIRouter()
 
 @router.get("/analytics/")
-def get_analytics(
-    db: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+async def get_analytics(
+    db: AsyncSession = Depends(dependencies.get_async_read_db),
+    current_user: models.User = Depends(dependencies.get_current_user_async)
 ):
-    prompt_count = db.query(models.Prompt).filter(models.Prompt.owner_id == current_user.id).count()
-    template_count = db.query(models.Template).filter(models.Template.owner_id == current_user.id).count()
-
-    export_count = db.query(models.Analytics).filter(
-        models.Analytics.owner_id == current_user.id,
-        models.Analytics.event_type == "export"
-    ).count()
-
-    generated_content_count = db.query(models.Analytics).filter(
-        models.Analytics.owner_id == current_user.id,
-        models.Analytics.event_type == "generate"
-    ).count()
-
-    user_memory_enabled = db.query(models.MemoryEmbedding).filter(
-        models.MemoryEmbedding.owner_id == current_user.id
-    ).count() > 0
-
-    embeddings_active = db.query(models.MemoryEmbedding).filter(
-        models.MemoryEmbedding.owner_id == current_user.id
-    ).count() > 0
-
-    # Avg. Response Time (assumes numeric 'response_time' in details or column)
-    avg_response_time = db.query(func.avg(models.Analytics.response_time)).filter(
-        models.Analytics.owner_id == current_user.id,
-        models.Analytics.response_time != None
-    ).scalar() or 0
-
-    # Prompt Effectiveness (assumes effectiveness stored in details as a numeric field or column)
-    avg_prompt_effectiveness = db.query(func.avg(models.Analytics.prompt_effectiveness)).filter(
-        models.Analytics.owner_id == current_user.id,
-        models.Analytics.prompt_effectiveness != None
-    ).scalar() or 0
-
-    # User Engagement (assumes engagement score or some "clicks/views/etc.")
-    avg_user_engagement = db.query(func.avg(models.Analytics.engagement_score)).filter(
-        models.Analytics.owner_id == current_user.id,
-        models.Analytics.engagement_score != None
-    ).scalar() or 0
-
-    return {
-        "prompt_count": prompt_count,
-        "template_count": template_count,
-        "export_count": export_count,
-        "generated_content_count": generated_content_count,
-        "user_memory_enabled": user_memory_enabled,
-        "embeddings_active": embeddings_active,
-        "avg_response_time": round(avg_response_time, 2),
-        "prompt_effectiveness": round(avg_prompt_effectiveness, 2),
-        "user_engagement": round(avg_user_engagement, 2)
-    }
+    dashboard = dashboard_cache.get(current_user.id)
+    if dashboard is None:
+        row = (await db.execute(dashboard_statement(current_user.id))).one()
+        dashboard = dashboard_from_row(row)
+        dashboard_cache.put(current_user.id, dashboard)
+    return dashboard
 
 @router.get("/analytics/export")
-def export_analytics(
+async def export_analytics(
     format: str,
-    db: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+    db: AsyncSession = Depends(dependencies.get_async_read_db),
+    current_user: models.User = Depends(dependencies.get_current_user_async)
 ):
-    analytics_entries = db.query(models.Analytics).filter(
+    result = await db.execute(select(models.Analytics).where(
         models.Analytics.owner_id == current_user.id
-    ).all()
+    ))
+    analytics_entries = result.scalars().all()
 
+    # Rendering every row (FPDF especially) is CPU-bound; keep it off the event loop
     if format == "csv":
-        return _export_analytics_csv(analytics_entries)
+        return await run_in_threadpool(_export_analytics_csv, analytics_entries)
     elif format == "pdf":
-        return _export_analytics_pdf(analytics_entries)
+        return await run_in_threadpool(_export_analytics_pdf, analytics_entries)
     else:
         raise HTTPException(status_code=400, detail="Unsupported format. Use csv or pdf.")
 
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, delete
 from app import models, dependencies
+from app.services.session_memory import session_memory
 from pydantic import BaseModel
 from typing import List
 from datetime import datetime
@@ -35,21 +36,21 @@ class ChatSession(BaseModel):
         }
 
 @router.get("/sessions/", response_model=List[ChatSession])
-def get_sessions(
-    db: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+async def get_sessions(
+    db: AsyncSession = Depends(dependencies.get_async_read_db),
+    current_user: models.User = Depends(dependencies.get_current_user_async)
 ):
-    sessions = (
-        db.query(
+    result = await db.execute(
+        select(
             models.ChatHistory.session_id,
             func.min(models.ChatHistory.timestamp).label("first_timestamp"),
             func.min(models.ChatHistory.prompt).label("first_prompt")
         )
-        .filter(models.ChatHistory.owner_id == current_user.id)
+        .where(models.ChatHistory.owner_id == current_user.id)
         .group_by(models.ChatHistory.session_id)
         .order_by(func.max(models.ChatHistory.timestamp).desc())
-        .all()
     )
+    sessions = result.all()
     return [
         {
             "session_id": s.session_id,
@@ -60,38 +61,38 @@ def get_sessions(
     ]
 
 @router.get("/session/{session_id}", response_model=List[ChatMessage])
-def get_session_history(
+async def get_session_history(
     session_id: str,
-    db: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+    db: AsyncSession = Depends(dependencies.get_async_read_db),
+    current_user: models.User = Depends(dependencies.get_current_user_async)
 ):
-    messages = (
-        db.query(models.ChatHistory)
-        .filter(models.ChatHistory.owner_id == current_user.id,
-                models.ChatHistory.session_id == session_id)
+    result = await db.execute(
+        select(models.ChatHistory)
+        .where(models.ChatHistory.owner_id == current_user.id,
+               models.ChatHistory.session_id == session_id)
         .order_by(models.ChatHistory.timestamp.asc())
-        .all()
     )
+    messages = result.scalars().all()
     if not messages:
         raise HTTPException(status_code=404, detail="Session not found or no messages.")
     return messages
 
 @router.delete("/session/{session_id}")
-def delete_session(
+async def delete_session(
     session_id: str,
-    db: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+    db: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: models.User = Depends(dependencies.get_current_user_async)
 ):
-    messages = (
-        db.query(models.ChatHistory)
-        .filter(models.ChatHistory.owner_id == current_user.id,
-                models.ChatHistory.session_id == session_id)
-        .all()
+    # One DELETE statement instead of loading and deleting each row
+    result = await db.execute(
+        delete(models.ChatHistory)
+        .where(models.ChatHistory.owner_id == current_user.id,
+               models.ChatHistory.session_id == session_id)
     )
-    if not messages:
+    if result.rowcount == 0:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Session not found.")
-
-    for message in messages:
-        db.delete(message)
-    db.commit()
+    await db.commit()
+    # Otherwise the next message in this session would still see the deleted turns
+    session_memory.drop(current_user.id, session_id)
     return {"detail": "Session deleted successfully."}
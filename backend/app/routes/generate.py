@@ -1,15 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from app.services.memory_service import add_embedding, search_embedding  # ← This must use sklearn internally
-from app.routes.memory import BufferMemory
+from app.services.memory_service import search_embedding
 from app import models, dependencies
 from pydantic import BaseModel
-import requests
-import json
+import asyncio
+import httpx
 import time
 import os
 from app.routes.memory_store import generate_embedding
+from app.services.groq_client import GroqStreamClient, GroqAPIError
+from app.services.retrieval_executor import retrieval_executor, ExecutorSaturated
+from app.services.response_cache import response_cache
+from app.services.persistence_queue import persistence_queue, GenerationRecord
+from app.services.session_memory import session_memory
+from app.services.context_builder import build_context
+from app.database import SessionLocal
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -21,80 +26,102 @@ if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY environment variable is not set.")
 
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-HEADERS = {
-    "Authorization": f"Bearer {GROQ_API_KEY}",
-    "Content-Type": "application/json"
-}
 
 # ✅ Use a model you're authorized for
 MODEL_NAME = "llama3-8b-8192"  # Or try "llama-3.1-8b-instant" if you want a newer one
 
-buffer_memory = BufferMemory(buffer_size=6)
+# One pooled (HTTP/2 when available) connection set shared by every stream on this worker
+groq_client = GroqStreamClient(GROQ_API_URL, GROQ_API_KEY, MODEL_NAME)
 
 class PromptRequest(BaseModel):
     prompt: str
     session_id: str
 
-def stream_content(messages: list):
-    payload = {
-        "model": MODEL_NAME,
-        "messages": messages,
-        "temperature": 0.7,
-        "stream": True,
-    }
-
-    response = requests.post(GROQ_API_URL, headers=HEADERS, json=payload, stream=True)
-
-    if response.status_code != 200:
-        raise Exception(f"GROQ API Error: {response.text}")
-
-    def event_stream():
-        for line in response.iter_lines():
-            if line:
-                if line.strip() == b"data: [DONE]":
-                    break
-                if line.startswith(b"data: "):
-                    data = line.removeprefix(b"data: ").decode("utf-8")
-                    try:
-                        chunk = json.loads(data)
-                        content_piece = chunk["choices"][0]["delta"].get("content", "")
-                        yield content_piece
-                    except Exception:
-                        continue
-
-    return event_stream()
+async def stream_content(messages: list):
+    try:
+        return await groq_client.stream_chat(messages)
+    except GroqAPIError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    # Transport failures left after the client's retries, before any headers were sent
+    except httpx.TimeoutException as e:
+        raise HTTPException(status_code=504, detail=f"Groq API timed out: {e!r}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Groq API unreachable: {e!r}")
+
+async def replay_cached(content: str, piece_size: int = 256):
+    for start in range(0, len(content), piece_size):
+        yield content[start:start + piece_size]
+
+def retrieve_context(prompt: str, owner_id: int, session_id: str):
+    """
+    Blocking retrieval stage; runs on the retrieval executor.
+
+    Covers everything that can stall the event loop: session rehydration,
+    the embedding forward pass, k-NN + SQLite, and tokenizing the history
+    (including the tokenizer's first load) while appending the prompt and
+    packing the context budget.
+    """
+    embedding = generate_embedding(prompt)
+    db = SessionLocal()
+    try:
+        memories = search_embedding(db, embedding, owner_id)
+    finally:
+        db.close()
+
+    session_memory.add_message(owner_id, session_id, "user", prompt)
+    buffer_messages = session_memory.get_messages(owner_id, session_id)
+
+    # Combine context within the model's token budget
+    messages, context_tokens = build_context(memories.matches, buffer_messages)
+    return embedding, buffer_messages, messages, context_tokens
 
 @router.post("/generate/")
 async def generate(
     request: PromptRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+    current_user: models.User = Depends(dependencies.get_current_user_async)
 ):
     prompt = request.prompt
     session_id = request.session_id
 
-    # Add to buffer memory
-    buffer_memory.add_message(session_id, "user", prompt)
-
-    # Search semantic memory
-    embedding = generate_embedding(prompt)
-
-    memories = search_embedding(db, embedding)  # <- This now uses sklearn under the hood
-
-    semantic_memory_msgs = [{"role": "user", "content": m.text} for m in memories.matches] if memories.matches else []
-    buffer_messages = buffer_memory.get_messages(session_id)
-
-    # Combine context
-    messages = semantic_memory_msgs + buffer_messages
+    # Search semantic memory and assemble the context off the event loop
+    try:
+        embedding, buffer_messages, messages, context_tokens = await retrieval_executor.run(
+            retrieve_context, prompt, current_user.id, session_id
+        )
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Server is busy, please retry shortly.", headers={"Retry-After": "1"})
 
     content_collector = []
     start_time = time.time()
 
-    def stream_and_save():
-        for chunk in stream_content(messages):
-            content_collector.append(chunk)
-            yield chunk
+    # Retrieved memories are left out of the cache key: they are re-derived from the
+    # same prompt but drift as new memories are added, which would defeat exact hits.
+    cached_content = response_cache.get(current_user.id, MODEL_NAME, buffer_messages, embedding)
+    if cached_content is not None:
+        chunks = replay_cached(cached_content)
+    else:
+        chunks = await stream_content(messages)
+
+    async def stream_and_save():
+        try:
+            async for chunk in chunks:
+                content_collector.append(chunk)
+                yield chunk
+            if cached_content is None:
+                response_cache.put(current_user.id, MODEL_NAME, buffer_messages, "".join(content_collector), embedding)
+        except httpx.HTTPError as e:
+            # The 200 is already on the wire; end the body early and don't cache the partial reply
+            print(f"[WARN] Groq stream interrupted for user {current_user.id}: {e!r}")
+        finally:
+            # Runs on completion and on client disconnect, so follow-ups see what was actually said
+            content = "".join(content_collector)
+            if content:
+                # Counting the reply's tokens is tokenizer work: hand it to a thread, not awaited,
+                # so it also runs when the stream is being cancelled
+                asyncio.get_running_loop().run_in_executor(
+                    None, session_memory.add_message, current_user.id, session_id, "assistant", content
+                )
 
     def save_data():
         content = "".join(content_collector)
@@ -105,35 +132,26 @@ async def generate(
             prompt_effectiveness = 0.0
         engagement_score = round(len(content) / 100.0, 2)
 
-        db.add(models.GeneratedContent(
-            text=content,
-            model_used=f"{MODEL_NAME} (groq)",
-            owner_id=current_user.id
-        ))
-
-        db.add(models.ChatHistory(
+        # Written in bulk, one transaction per batch, by the persistence queue's writer thread
+        persistence_queue.submit(GenerationRecord(
+            owner_id=current_user.id,
             session_id=session_id,
             prompt=prompt,
-            response=content,
-            owner_id=current_user.id
-        ))
-
-        add_embedding(db, embedding, prompt, current_user.id)
-
-        db.add(models.Analytics(
-            event_type="generate",
-            details=f"Generated content using Groq ({MODEL_NAME})",
-            owner_id=current_user.id,
+            content=content,
+            model_used=f"{MODEL_NAME} (groq)",
+            details=f"Served from response cache ({MODEL_NAME})" if cached_content is not None
+            else f"Generated content using Groq ({MODEL_NAME})",
+            embedding=embedding,
             response_time=response_time,
             prompt_effectiveness=prompt_effectiveness,
             engagement_score=engagement_score
         ))
 
-        db.commit()
-
     background_tasks.add_task(save_data)
 
-    # ✅ Store empty string for assistant before content is streamed
-    buffer_memory.add_message(session_id, "assistant", "")
-
-    return StreamingResponse(stream_and_save(), media_type="text/plain")
+    return StreamingResponse(
+        stream_and_save(),
+        media_type="text/plain",
+        # Approximate: counted with CONTEXT_TOKENIZER locally, not reported by Groq
+        headers={"X-Context-Tokens": str(context_tokens)}
+    )
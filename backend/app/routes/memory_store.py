@@ -1,16 +1,63 @@
-from transformers import AutoTokenizer, AutoModel
-import torch
+import numpy as np
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_batcher import EmbeddingBatcher, EMBEDDING_BATCHING
+from app.services.model_registry import registry
+from app.services.embedding_backends import load_backend, EMBEDDING_BACKEND
 
 EMBEDDING_MODEL_NAME = "microsoft/MiniLM-L12-H384-uncased"
 
-tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
-model = AutoModel.from_pretrained(EMBEDDING_MODEL_NAME)
+def _load_embedding_model():
+    # Backend libraries are imported inside load_backend, so importing this module stays cheap
+    return load_backend(EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME)
+
+registry.register("embedding", _load_embedding_model)
+
+def _embed_batch(texts):
+    return registry.get("embedding").embed(texts)
+
+# Repeated prompts (retries, regenerations, templates) skip the forward pass
+embedding_cache = EmbeddingCache(f"{EMBEDDING_MODEL_NAME}:{EMBEDDING_BACKEND}")
+# Concurrent requests share one padded forward pass
+embedding_batcher = EmbeddingBatcher(_embed_batch)
 
 def generate_embedding(text: str):
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
-    with torch.no_grad():
-        outputs = model(**inputs)
-    return outputs.last_hidden_state.mean(dim=1).squeeze().numpy()
+    cached = embedding_cache.get(text)
+    if cached is not None:
+        return cached
+
+    if EMBEDDING_BATCHING:
+        embedding = embedding_batcher.embed(text)
+    else:
+        embedding = _embed_batch([text])[0]
+    embedding_cache.put(text, embedding)
+    return embedding
+
+def generate_embeddings(texts: list[str], normalize: bool = False, dtype: str = "float32", batch_size: int = 64):
+    """
+    Embed many texts with mask-aware mean pooling, ``batch_size`` texts per forward pass.
+
+    ``normalize`` L2-normalizes each row. ``dtype`` may be "float32", "float16"
+    or "int8"; int8 output is always normalized and scaled by 127.
+    """
+    if dtype not in ("float32", "float16", "int8"):
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    if not texts:
+        return np.empty((0, get_sentence_embedding_dimension()), dtype=dtype)
+
+    # Group texts of similar length so each batch pads as little as possible
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    embeddings = np.empty((len(texts), get_sentence_embedding_dimension()), dtype="float32")
+    for start in range(0, len(order), batch_size):
+        chunk = order[start:start + batch_size]
+        embeddings[chunk] = _embed_batch([texts[i] for i in chunk])
+
+    if normalize or dtype == "int8":
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.maximum(norms, 1e-12)
+
+    if dtype == "int8":
+        return np.clip(np.rint(embeddings * 127.0), -127, 127).astype("int8")
+    return embeddings.astype(dtype)
 
 def get_sentence_embedding_dimension() -> int:
     return 384  # for MiniLM-L12-H384
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from app import models, dependencies, database
+from app.routes.memory_store import embedding_cache, embedding_batcher
+from app.services.model_registry import registry
+from app.services.retrieval_executor import retrieval_executor
+from app.services.response_cache import response_cache
+from app.services.persistence_queue import persistence_queue
+from app.services.session_memory import session_memory
+from app.services.principal_cache import principal_cache
+from app.services.analytics_dashboard import dashboard_cache
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/")
+def get_metrics(current_user: models.User = Depends(dependencies.require_role("Admin"))):
+    """Runtime counters for the in-process caches and queues (Admin only)."""
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "embedding_batcher": embedding_batcher.stats(),
+        "models": registry.stats(),
+        "retrieval_executor": retrieval_executor.stats(),
+        "response_cache": response_cache.stats(),
+        "persistence_queue": persistence_queue.stats(),
+        "session_memory": session_memory.stats(),
+        "principal_cache": principal_cache.stats(),
+        "analytics_cache": dashboard_cache.stats(),
+        "database": database.pool_stats(),
+    }
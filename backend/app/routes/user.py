@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.dependencies import get_current_user, get_db
 from app.models import User
 from app.schemas import UserOut
+from app.services.principal_cache import principal_cache
 import os
 import shutil
 
@@ -22,6 +23,8 @@ def update_my_profile(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    # current_user may come from the principal cache; modify the row in this session
+    current_user = db.get(User, current_user.id)
     if email:
         if "@" not in email or "." not in email:
             raise HTTPException(status_code=400, detail="Invalid email address")
@@ -32,6 +35,7 @@ def update_my_profile(
 
     db.commit()
     db.refresh(current_user)
+    principal_cache.invalidate_user(current_user.id)
     return UserOut.model_validate(current_user)
 
 @router.post("/upload-profile-pic", response_model=UserOut)
@@ -56,8 +60,10 @@ async def upload_profile_pic(
         shutil.copyfileobj(file.file, buffer)
 
     # Update URL
+    current_user = db.get(User, current_user.id)
     current_user.profile_pic_url = f"/static/profile_pics/{filename}"
 
     db.commit()
     db.refresh(current_user)
+    principal_cache.invalidate_user(current_user.id)
     return UserOut.model_validate(current_user)
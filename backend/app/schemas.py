@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from datetime import datetime
 from typing import List, Optional
 
@@ -99,7 +99,7 @@ class AddMemoryRequest(BaseModel):
 
 class SearchMemoryRequest(BaseModel):
     query: str
-    k: int = 3
+    k: int = Field(3, ge=1, le=500)
 
 class AddMemoryResponse(BaseModel):
     message: str
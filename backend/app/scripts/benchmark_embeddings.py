@@ -0,0 +1,75 @@
+"""
+Compare embedding backends on this machine.
+
+    python -m app.scripts.benchmark_embeddings --backends fp32 int8 onnx
+
+For each backend this reports single-sentence p50/p99 latency, batched
+throughput in sentences/sec, and cosine parity against the fp32 model.
+"""
+import argparse
+import time
+import numpy as np
+from app.routes.memory_store import EMBEDDING_MODEL_NAME
+from app.services.embedding_backends import load_backend, check_parity
+
+SAMPLE_SENTENCES = [
+    "Write a short blog post about remote work.",
+    "Summarize the benefits of renewable energy for a general audience.",
+    "Draft a product description for noise-cancelling headphones.",
+    "Give me five catchy subject lines for a spring sale newsletter.",
+    "Explain vector databases to a marketing team in two paragraphs.",
+    "Create an outline for a whitepaper on cloud cost optimization.",
+    "What are good hashtags for a coffee shop opening?",
+    "Rewrite this sentence to sound more professional: we fixed the bug lol.",
+]
+
+
+def benchmark(backend, sentences, batch_size: int, rounds: int) -> dict:
+    backend.embed(sentences[:2])  # warm-up
+
+    latencies = []
+    for _ in range(rounds):
+        for sentence in sentences:
+            start = time.perf_counter()
+            backend.embed([sentence])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    corpus = sentences * max(1, (batch_size * rounds) // len(sentences))
+    start = time.perf_counter()
+    for i in range(0, len(corpus), batch_size):
+        backend.embed(corpus[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "backend": backend.name,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "sentences_per_sec": round(len(corpus) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["fp32", "int8", "onnx"])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    reference = load_backend("fp32", EMBEDDING_MODEL_NAME)
+    for name in args.backends:
+        try:
+            backend = reference if name == "fp32" else load_backend(name, EMBEDDING_MODEL_NAME)
+        except ImportError as e:
+            # onnx needs onnxruntime (and onnx to export); report the gap instead of losing the whole run
+            print(f"{name:>5}  skipped: {e}")
+            continue
+        result = benchmark(backend, SAMPLE_SENTENCES, args.batch_size, args.rounds)
+        parity = check_parity(backend, reference, SAMPLE_SENTENCES)
+        print(
+            f"{result['backend']:>5}  p50 {result['p50_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  "
+            f"{result['sentences_per_sec']:>8} sent/s  min cosine vs fp32 {parity['min_cosine']:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
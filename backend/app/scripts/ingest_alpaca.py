@@ -1,29 +1,46 @@
+"""
+Bulk-load the Alpaca dataset into one user's semantic memory.
+
+Run it with the API server stopped: the script allocates faiss_ids and
+appends to the owner's shard files itself, so it takes the same lock on
+MEMORY_INDEX_DIR as the server and refuses to start while the server
+holds it (and vice versa). Start the server again afterwards to serve
+the ingested memories.
+"""
 import json
-from app.routes.memory_store import embedder
-from app.services.memory_service import add_embedding
+import os
+import sys
+from app.services.memory_service import add_embeddings_bulk, IndexInUseError
 from app.database import SessionLocal
-from app import models
 
-DB = SessionLocal()
-OWNER_ID = 1  # Change if using user-specific memory
+DATA_PATH = "training/alpaca_data.jsonl"
+OWNER_ID = int(os.getenv("INGEST_OWNER_ID", "1"))  # Change if using user-specific memory
+CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1024"))
+
 
-# Correct relative path to alpaca_data.jsonl
-with open("training/alpaca_data.jsonl", "r", encoding="utf-8") as f:
-    for line in f:
-        try:
-            data = json.loads(line)
-            instruction = data.get("instruction", "")
-            input_text = data.get("input", "")
-            output = data.get("output", "")
+def iter_texts(path):
+    """Yield one memory text per dataset line without loading the file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            try:
+                data = json.loads(line)
+                instruction = data.get("instruction", "")
+                input_text = data.get("input", "")
+                output = data.get("output", "")
 
-            prompt = instruction + "\n" + input_text if input_text else instruction
-            full_text = f"{prompt}\n\n{output}"
+                prompt = instruction + "\n" + input_text if input_text else instruction
+                yield f"{prompt}\n\n{output}"
+            except Exception as e:
+                print(f"❌ Skipping line {line_no} due to error: {e}")
 
-            embedding = embedder.encode(full_text, convert_to_numpy=True)
-            add_embedding(DB, embedding, full_text, OWNER_ID)
-        except Exception as e:
-            print(f"❌ Skipping line due to error: {e}")
 
-DB.commit()
-DB.close()
-print("✅ Alpaca ingestion complete.")
+if __name__ == "__main__":
+    DB = SessionLocal()
+    try:
+        count = add_embeddings_bulk(DB, iter_texts(DATA_PATH), OWNER_ID, chunk_size=CHUNK_SIZE)
+    except IndexInUseError as e:
+        print(f"❌ {e} Stop the API server before ingesting, then start it again afterwards.")
+        sys.exit(1)
+    finally:
+        DB.close()
+    print(f"✅ Alpaca ingestion complete ({count} memories).")
@@ -0,0 +1,67 @@
+import os
+from sqlalchemy import case, exists, func, select
+from app import models
+from app.utils.ttl_cache import TTLCache
+
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "30"))  # 0 disables the cache
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "5000"))
+
+
+def dashboard_statement(owner_id: int):
+    """
+    Every dashboard figure in one SELECT: conditional sums and averages over
+    the user's Analytics rows, owner-indexed counts of prompts and templates,
+    and an EXISTS probe for stored memories.
+    """
+    analytics = models.Analytics
+
+    prompt_count = select(func.count()).select_from(models.Prompt).where(
+        models.Prompt.owner_id == owner_id
+    ).scalar_subquery()
+    template_count = select(func.count()).select_from(models.Template).where(
+        models.Template.owner_id == owner_id
+    ).scalar_subquery()
+    has_memories = exists().where(models.MemoryEmbedding.owner_id == owner_id)
+
+    return select(
+        prompt_count.label("prompt_count"),
+        template_count.label("template_count"),
+        has_memories.label("has_memories"),
+        func.coalesce(func.sum(case((analytics.event_type == "export", 1), else_=0)), 0).label("export_count"),
+        func.coalesce(func.sum(case((analytics.event_type == "generate", 1), else_=0)), 0).label("generate_count"),
+        # AVG skips NULLs, which matches the old "column != None" filters
+        func.avg(analytics.response_time).label("avg_response_time"),
+        func.avg(analytics.prompt_effectiveness).label("avg_prompt_effectiveness"),
+        func.avg(analytics.engagement_score).label("avg_engagement_score"),
+    ).select_from(analytics).where(analytics.owner_id == owner_id)
+
+
+def dashboard_from_row(row) -> dict:
+    return {
+        "prompt_count": row.prompt_count,
+        "template_count": row.template_count,
+        "export_count": row.export_count,
+        "generated_content_count": row.generate_count,
+        "user_memory_enabled": bool(row.has_memories),
+        "embeddings_active": bool(row.has_memories),
+        "avg_response_time": round(row.avg_response_time or 0, 2),
+        "prompt_effectiveness": round(row.avg_prompt_effectiveness or 0, 2),
+        "user_engagement": round(row.avg_engagement_score or 0, 2),
+    }
+
+
+class DashboardCache(TTLCache):
+    """Per-user dashboards kept for ``ttl`` seconds, at most ``max_entries`` users in LRU order."""
+
+    def __init__(self, ttl: float = ANALYTICS_CACHE_TTL, max_entries: int = ANALYTICS_CACHE_SIZE):
+        super().__init__(max_entries, ttl)
+
+    def get(self, owner_id: int):
+        dashboard = super().get(owner_id)
+        return dict(dashboard) if dashboard is not None else None
+
+    def put(self, owner_id: int, dashboard: dict):
+        super().put(owner_id, dict(dashboard))
+
+
+dashboard_cache = DashboardCache()
@@ -0,0 +1,96 @@
+import os
+import re
+from typing import Dict, List
+from app.services.model_registry import registry
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6144"))  # leaves ~2k of llama3-8b-8192 for the reply
+CONTEXT_MEMORY_SHARE = float(os.getenv("CONTEXT_MEMORY_SHARE", "0.4"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.9"))
+# Counts only approximate what Groq bills: the default is Llama 3's tokenizer (an ungated
+# mirror), matching llama3-8b-8192, but Groq's chat template may add tokens we don't see.
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "NousResearch/Meta-Llama-3-8B")
+MESSAGE_OVERHEAD_TOKENS = 4  # role/formatting tokens the chat template adds per message
+
+
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(CONTEXT_TOKENIZER)
+
+registry.register("tokenizer", _load_tokenizer)
+
+_tokenizer_unavailable = False
+
+
+def count_tokens(text: str) -> int:
+    """Token count from the local tokenizer, or a ~3 UTF-8 bytes/token estimate if it can't be loaded."""
+    global _tokenizer_unavailable
+
+    if not _tokenizer_unavailable:
+        try:
+            return len(registry.get("tokenizer").encode(text, add_special_tokens=False))
+        except Exception as e:
+            _tokenizer_unavailable = True
+            print(f"[WARN] Context tokenizer unavailable, estimating token counts: {e}")
+    # Bytes rather than characters, so emoji and non-Latin scripts aren't undercounted
+    return max(1, len(text.encode("utf-8")) // 3)
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _shingles(text: str) -> set:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def _is_near_duplicate(text: str, selected: List[set], threshold: float) -> bool:
+    words = _shingles(text)
+    for other in selected:
+        union = words | other
+        if not union or len(words & other) / len(union) >= threshold:
+            return True
+    return False
+
+
+def build_context(memories, history: List[Dict[str, str]], budget: int = CONTEXT_TOKEN_BUDGET,
+                  memory_share: float = CONTEXT_MEMORY_SHARE, dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD):
+    """
+    Pack retrieved memories and recent turns into ``budget`` tokens.
+
+    The newest history message (the prompt being answered) is always kept.
+    Memories are taken closest-first, skipping near-duplicates of each other
+    and of the prompt, until they use ``memory_share`` of the budget; older
+    turns then fill what is left, newest first. Returns (messages, tokens).
+    """
+    if not history:
+        return [], 0
+
+    current = history[-1]
+    used = message_tokens(current)
+    seen = [_shingles(current["content"])]
+
+    memory_msgs = []
+    memory_budget = int(budget * memory_share)
+    memory_used = 0
+    for match in sorted(memories, key=lambda m: m.distance):
+        if not match.text or _is_near_duplicate(match.text, seen, dedup_threshold):
+            continue
+        message = {"role": "user", "content": match.text}
+        cost = message_tokens(message)
+        if memory_used + cost > memory_budget or used + cost > budget:
+            continue
+        memory_msgs.append(message)
+        seen.append(_shingles(match.text))
+        memory_used += cost
+        used += cost
+
+    earlier = []
+    for message in reversed(history[:-1]):
+        cost = message_tokens(message)
+        if used + cost > budget:
+            break
+        earlier.append(message)
+        used += cost
+    earlier.reverse()
+
+    return memory_msgs + earlier + [current], used
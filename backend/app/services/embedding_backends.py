@@ -0,0 +1,107 @@
+import os
+import numpy as np
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "fp32")  # fp32 | int8 | onnx
+EMBEDDING_ONNX_PATH = os.getenv("EMBEDDING_ONNX_PATH", "models/embedding_model.onnx")
+
+
+def mean_pool(hidden_states: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average token vectors over real (unmasked) tokens only."""
+    mask = attention_mask[..., None].astype(hidden_states.dtype)
+    return (hidden_states * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+
+class TorchBackend:
+    """HF PyTorch model on CPU, fp32 or with int8 dynamic quantization of its Linear layers."""
+
+    def __init__(self, model_name: str, quantize: bool = False):
+        import torch
+        from transformers import AutoTokenizer, AutoModel
+
+        self.name = "int8" if quantize else "fp32"
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+
+    def embed(self, texts) -> np.ndarray:
+        import torch
+
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+        with torch.no_grad():
+            outputs = self.model(**inputs)
+        return mean_pool(outputs.last_hidden_state.numpy(), inputs["attention_mask"].numpy())
+
+
+class OnnxBackend:
+    """The same model exported to ONNX and run with onnxruntime; exported on first use if missing."""
+
+    def __init__(self, model_name: str, onnx_path: str = EMBEDDING_ONNX_PATH):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.name = "onnx"
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if not os.path.exists(onnx_path):
+            export_onnx(model_name, onnx_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def embed(self, texts) -> np.ndarray:
+        inputs = self.tokenizer(texts, return_tensors="np", padding=True, truncation=True)
+        feed = {name: value.astype("int64") for name, value in inputs.items() if name in self.input_names}
+        hidden = self.session.run(None, feed)[0]
+        return mean_pool(hidden, inputs["attention_mask"])
+
+
+def export_onnx(model_name: str, onnx_path: str):
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = list(sample.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    torch.onnx.export(
+        model,
+        tuple(sample[name] for name in names),
+        onnx_path,
+        input_names=names,
+        output_names=["last_hidden_state"],
+        dynamic_axes=dynamic_axes,
+        opset_version=17,
+    )
+    print(f"[INFO] Exported {model_name} to {onnx_path}")
+
+
+def load_backend(name: str, model_name: str):
+    if name == "fp32":
+        return TorchBackend(model_name)
+    if name == "int8":
+        return TorchBackend(model_name, quantize=True)
+    if name == "onnx":
+        return OnnxBackend(model_name)
+    raise ValueError(f"Unknown embedding backend '{name}'. Use fp32, int8 or onnx.")
+
+
+def check_parity(candidate, reference, texts) -> dict:
+    """Cosine similarity between a candidate backend's embeddings and the fp32 reference."""
+    a = candidate.embed(texts)
+    b = reference.embed(texts)
+    cosine = (a * b).sum(axis=1) / np.maximum(np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12)
+    return {
+        "backend": candidate.name,
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(a - b).max()),
+    }
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+from app.utils.ttl_cache import TTLCache
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")  # e.g. "embedding_cache.db"; empty keeps it in memory only
+
+
+class EmbeddingCache:
+    """
+    Content-hash keyed LRU cache of embedding vectors.
+
+    Entries are keyed by sha256(model name + text), so identical prompts skip
+    the model entirely. With a ``path`` the cache is also written through to a
+    small SQLite file and memory misses fall back to it, so a restarted
+    process starts warm.
+    """
+
+    def __init__(self, model_name: str, max_entries: int = EMBEDDING_CACHE_SIZE, path: str = EMBEDDING_CACHE_PATH):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = TTLCache(max_entries)  # key -> vector, no expiry
+        self._lock = threading.Lock()  # guards the disk tier
+        self._disk = None
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dtype TEXT, vector BLOB)")
+            self._disk.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str):
+        key = self._key(text)
+        vector = self._entries.get(key)
+        if vector is not None:
+            return vector.copy()
+
+        with self._lock:
+            if self._disk is not None:
+                row = self._disk.execute("SELECT dtype, vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[1], dtype=row[0]).copy()
+                    self._entries.put(key, vector)
+                    self.disk_hits += 1
+                    return vector.copy()
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vector):
+        key = self._key(text)
+        vector = np.array(vector, copy=True)
+        self._entries.put(key, vector)
+        if self._disk is not None:
+            with self._lock:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, dtype, vector) VALUES (?, ?, ?)",
+                    (key, vector.dtype.str, vector.tobytes())
+                )
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        memory = self._entries.stats()
+        with self._lock:
+            lookups = memory["hits"] + self.disk_hits + self.misses
+            return {
+                "entries": memory["entries"],
+                "max_entries": self.max_entries,
+                "hits": memory["hits"],
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": memory["evictions"],
+                "hit_rate": round((memory["hits"] + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "persistent": self._disk is not None,
+            }
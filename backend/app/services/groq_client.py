@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import httpx
+
+GROQ_TIMEOUT_CONNECT = float(os.getenv("GROQ_TIMEOUT_CONNECT", "5"))
+GROQ_TIMEOUT_READ = float(os.getenv("GROQ_TIMEOUT_READ", "60"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "200"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "2"))
+GROQ_RETRY_BACKOFF = float(os.getenv("GROQ_RETRY_BACKOFF", "0.5"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class GroqAPIError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"GROQ API Error ({status_code}): {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class GroqStreamClient:
+    """
+    Streams chat completions over one shared, pooled httpx.AsyncClient.
+
+    ``stream_chat`` opens the request (retrying connection errors and
+    429/5xx responses with exponential backoff) and only returns once the
+    upstream has answered 200, so callers can still turn failures into an
+    HTTP error before any bytes reach the client. The returned async
+    generator yields the ``delta.content`` pieces of the SSE stream.
+    """
+
+    def __init__(self, api_url: str, api_key: str, model: str,
+                 connect_timeout: float = GROQ_TIMEOUT_CONNECT, read_timeout: float = GROQ_TIMEOUT_READ,
+                 max_connections: int = GROQ_MAX_CONNECTIONS, max_retries: int = GROQ_MAX_RETRIES,
+                 backoff: float = GROQ_RETRY_BACKOFF, http2: bool = HTTP2_AVAILABLE, transport=None):
+        self.api_url = api_url
+        self.model = model
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._client_kwargs = {
+            "http2": http2,
+            "timeout": httpx.Timeout(read_timeout, connect=connect_timeout),
+            "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            "transport": transport,
+        }
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(**self._client_kwargs)
+        return self._client
+
+    async def _open(self, payload: dict) -> httpx.Response:
+        attempt = 0
+        while True:
+            request = self.client.build_request("POST", self.api_url, headers=self.headers, json=payload)
+            try:
+                response = await self.client.send(request, stream=True)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError):
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code == 200:
+                    return response
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                await response.aclose()
+                if response.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    raise GroqAPIError(response.status_code, body)
+
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    async def stream_chat(self, messages: list, temperature: float = 0.7):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": True,
+        }
+        response = await self._open(payload)
+        return self._iter_content(response)
+
+    async def _iter_content(self, response: httpx.Response):
+        try:
+            async for line in response.aiter_lines():
+                line = line.strip()
+                if not line:
+                    continue
+                if line == "data: [DONE]":
+                    break
+                if line.startswith("data: "):
+                    try:
+                        chunk = json.loads(line.removeprefix("data: "))
+                        yield chunk["choices"][0]["delta"].get("content", "") or ""
+                    except Exception:
+                        continue
+        finally:
+            await response.aclose()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
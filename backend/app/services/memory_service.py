@@ -1,32 +1,169 @@
+import os
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
 from app import models
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal
 from app.schemas import AddMemoryResponse, SearchResponse, Match
-from app.routes.memory_store import generate_embedding, get_sentence_embedding_dimension  # ✅ Updated here
+from app.routes.memory_store import generate_embedding, generate_embeddings, get_sentence_embedding_dimension  # ✅ Updated here
+from app.utils.vector_index import VectorIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 DIM = get_sentence_embedding_dimension()
+MEMORY_INDEX_DIR = os.getenv("MEMORY_INDEX_DIR", "memory_index")
+MAX_RESIDENT_SHARDS = int(os.getenv("MEMORY_MAX_RESIDENT_SHARDS", "256"))
+OWNER_LOCK_FILE = "index.lock"
 
-# Global in-memory storage (consider persisting with a real vector DB for production)
-stored_embeddings = []
-stored_texts = []
-stored_ids = []
-nn_model = None
+# One index shard per owner, loaded lazily from MEMORY_INDEX_DIR/owner_<id> and
+# kept in LRU order so idle users' vectors drop out of RAM (they stay on disk).
+# index_lock only guards this bookkeeping; each shard locks itself for add/search,
+# and a per-owner lock serializes that owner's snapshot loads and appends.
+shards: "OrderedDict[int, VectorIndex]" = OrderedDict()
+owner_locks = {}
+next_faiss_id = 0
+index_loaded = False
+index_lock = threading.Lock()
+shard_evictions = 0
+index_owner_file = None  # held open (and locked) for the life of the process that loaded the index
 
 
-def rebuild_index():
-    global nn_model
-    if stored_embeddings:
-        X = np.vstack(stored_embeddings)
-        nn_model = NearestNeighbors(n_neighbors=min(3, len(stored_embeddings)), metric='euclidean')
-        nn_model.fit(X)
-    else:
-        nn_model = None
+class IndexInUseError(RuntimeError):
+    """Another process (the API server or an ingest run) already owns MEMORY_INDEX_DIR."""
 
 
-def add_embedding(db: Session, embedding, text: str, owner_id: int) -> AddMemoryResponse:
-    global stored_embeddings, stored_texts, stored_ids
+def _claim_index_dir():
+    """
+    Take an exclusive lock on MEMORY_INDEX_DIR for this process.
+
+    Faiss ids and shard files are only safe with a single writer process:
+    two allocators hand out the same ids, and interleaved appends misalign
+    a shard's vectors and ids.
+    """
+    global index_owner_file
+
+    if index_owner_file is not None:
+        return
+    os.makedirs(MEMORY_INDEX_DIR, exist_ok=True)
+    handle = open(os.path.join(MEMORY_INDEX_DIR, OWNER_LOCK_FILE), "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        raise IndexInUseError(f"Memory index at {MEMORY_INDEX_DIR} is in use by another process.")
+    index_owner_file = handle
+
+
+def _shard_path(owner_id: int) -> str:
+    return os.path.join(MEMORY_INDEX_DIR, f"owner_{owner_id}")
+
+
+def _owner_lock(owner_id: int) -> threading.RLock:
+    with index_lock:
+        lock = owner_locks.get(owner_id)
+        if lock is None:
+            lock = owner_locks[owner_id] = threading.RLock()
+        return lock
+
+
+def _resident_shard(owner_id: int):
+    with index_lock:
+        shard = shards.get(owner_id)
+        if shard is not None:
+            shards.move_to_end(owner_id)
+        return shard
+
+
+def get_shard(owner_id: int) -> VectorIndex:
+    """Return the owner's shard, loading it on a miss without blocking other owners."""
+    global shard_evictions
+
+    shard = _resident_shard(owner_id)
+    if shard is not None:
+        return shard
+
+    # Loading truncates torn tails, so it must not overlap an append to the same snapshot
+    with _owner_lock(owner_id):
+        shard = _resident_shard(owner_id)
+        if shard is not None:
+            return shard
+        shard = VectorIndex.load(_shard_path(owner_id), DIM)
+        with index_lock:
+            shards[owner_id] = shard
+            while len(shards) > MAX_RESIDENT_SHARDS:
+                shards.popitem(last=False)
+                shard_evictions += 1
+    return shard
+
 
+def load_index(db: Session):
+    """Prepare the sharded index and resume faiss_id allocation after the table's max id."""
+    global next_faiss_id, index_loaded
+
+    _claim_index_dir()
+    # Vectors are indexed only after their row commits, so the table is the source of truth for ids.
+    max_db_id = db.query(func.max(models.MemoryEmbedding.faiss_id)).scalar()
+    with index_lock:
+        next_faiss_id = (max_db_id if max_db_id is not None else -1) + 1
+        shards.clear()
+        index_loaded = True
+
+    print(f"[INFO] Memory index ready at {MEMORY_INDEX_DIR} (next faiss_id {next_faiss_id}).")
+
+
+def _load_index_if_needed():
+    """Load the index with a private session; for callers that don't hold a sync one."""
+    if index_loaded:
+        return
+    db = SessionLocal()
+    try:
+        load_index(db)
+    finally:
+        db.close()
+
+
+def reserve_faiss_ids(db: Session, count: int) -> list:
+    """Hand out ``count`` consecutive faiss_ids for rows the caller is about to insert."""
+    global next_faiss_id
+
+    if not index_loaded:
+        load_index(db)
+    with index_lock:
+        start = next_faiss_id
+        next_faiss_id += count
+    return list(range(start, start + count))
+
+
+def resync_faiss_ids(db: Session):
+    """Move the allocator past the table's max faiss_id, e.g. after another writer inserted rows."""
+    global next_faiss_id
+
+    max_db_id = db.query(func.max(models.MemoryEmbedding.faiss_id)).scalar()
+    with index_lock:
+        next_faiss_id = max(next_faiss_id, (max_db_id if max_db_id is not None else -1) + 1)
+    print(f"[INFO] Resynced faiss_id allocation to {next_faiss_id}.")
+
+
+def index_embeddings(owner_id: int, vectors, faiss_ids):
+    """Add vectors to the owner's shard; call only after their memory rows have committed."""
+    with _owner_lock(owner_id):
+        get_shard(owner_id).add(vectors, faiss_ids)
+
+
+def _as_row_vector(embedding, label: str):
     embedding = np.array(embedding, dtype='float32')
     if embedding.ndim == 1:
         vec = embedding.reshape(1, -1)
@@ -36,13 +173,16 @@ def add_embedding(db: Session, embedding, text: str, owner_id: int) -> AddMemory
         raise ValueError(f"Unexpected embedding shape: {embedding.shape}")
 
     if vec.shape[1] != DIM:
-        raise ValueError(f"Embedding dimension mismatch: expected {DIM}, got {vec.shape[1]}")
+        raise ValueError(f"{label} dimension mismatch: expected {DIM}, got {vec.shape[1]}")
+    return vec
 
-    vec_id = len(stored_embeddings)
 
-    stored_embeddings.append(vec)
-    stored_texts.append(text)
-    stored_ids.append(vec_id)
+def add_embedding(db: Session, embedding, text: str, owner_id: int) -> AddMemoryResponse:
+    if not index_loaded:
+        load_index(db)
+
+    vec = _as_row_vector(embedding, "Embedding")
+    vec_id = reserve_faiss_ids(db, 1)[0]
 
     memory = models.MemoryEmbedding(
         faiss_id=vec_id,
@@ -52,42 +192,115 @@ def add_embedding(db: Session, embedding, text: str, owner_id: int) -> AddMemory
     db.add(memory)
     db.commit()
 
-    rebuild_index()
+    index_embeddings(owner_id, vec, [vec_id])
 
     response = AddMemoryResponse(message="Memory added", faiss_id=vec_id)
     print("[DEBUG] Returning from add_embedding:", response.dict())
     return response
 
 
-def search_embedding(db: Session, embedding, k: int = 3) -> SearchResponse:
-    if not stored_embeddings or nn_model is None:
-        print("[INFO] Search called but index is empty.")
+def add_embeddings_bulk(db: Session, texts, owner_id: int, chunk_size: int = 1024, batch_size: int = 64) -> int:
+    """
+    Embed and store an iterable of texts ``chunk_size`` at a time.
+
+    Each chunk is embedded in batches, inserted with one executemany,
+    committed, then appended to the owner's shard, so ingestion is linear
+    and an interrupted run keeps every chunk that committed.
+    """
+    if not index_loaded:
+        load_index(db)
+
+    total = 0
+    start = time.perf_counter()
+    chunk = []
+
+    def flush():
+        nonlocal total
+        vectors = generate_embeddings(chunk, batch_size=batch_size)
+        faiss_ids = reserve_faiss_ids(db, len(chunk))
+        db.execute(insert(models.MemoryEmbedding), [
+            {"faiss_id": faiss_id, "owner_id": owner_id, "text": text}
+            for text, faiss_id in zip(chunk, faiss_ids)
+        ])
+        db.commit()
+        index_embeddings(owner_id, vectors, faiss_ids)
+
+        total += len(chunk)
+        chunk.clear()
+        elapsed = time.perf_counter() - start
+        print(f"[INFO] Ingested {total} memories ({total / max(elapsed, 1e-9):.0f}/sec)")
+
+    for text in texts:
+        chunk.append(text)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return total
+
+
+def search_embedding(db: Session, embedding, owner_id: int, k: int = 3) -> SearchResponse:
+    if not index_loaded:
+        load_index(db)
+
+    distances, neighbour_ids = _search_shard(owner_id, _as_row_vector(embedding, "Query embedding"), k)
+    if not neighbour_ids:
         return SearchResponse(matches=[])
 
-    embedding = np.array(embedding, dtype='float32')
-    if embedding.ndim == 1:
-        vec = embedding.reshape(1, -1)
-    elif embedding.ndim == 2 and embedding.shape[0] == 1:
-        vec = embedding
-    else:
-        raise ValueError(f"Unexpected embedding shape: {embedding.shape}")
+    # One IN query for all neighbours instead of a round trip per id
+    rows = db.query(models.MemoryEmbedding.faiss_id, models.MemoryEmbedding.text).filter(
+        models.MemoryEmbedding.faiss_id.in_(neighbour_ids),
+        models.MemoryEmbedding.owner_id == owner_id
+    ).all()
+    return _matches(rows, neighbour_ids, distances)
 
-    if vec.shape[1] != DIM:
-        raise ValueError(f"Query embedding dimension mismatch: expected {DIM}, got {vec.shape[1]}")
-
-    distances, indices = nn_model.kneighbors(vec, n_neighbors=min(k, len(stored_embeddings)))
-
-    matches = []
-    for idx, dist in zip(indices[0], distances[0]):
-        memory = db.query(models.MemoryEmbedding).filter_by(faiss_id=idx).first()
-        if memory:
-            match = Match(
-                faiss_id=memory.faiss_id,
-                text=memory.text,
-                distance=float(dist)
-            )
-            matches.append(match)
-
-    response = SearchResponse(matches=matches)
-    print("[DEBUG] Returning from search_embedding:", response.dict())
-    return response
+
+def _search_shard(owner_id: int, vec, k: int):
+    shard = get_shard(owner_id)
+    if len(shard) == 0:
+        return [], []
+    distances, indices = shard.search(vec, k)
+    return distances, [int(idx) for idx in indices]
+
+
+def _matches(rows, neighbour_ids, distances) -> SearchResponse:
+    texts = {row.faiss_id: row.text for row in rows}
+    matches = [
+        Match(faiss_id=idx, text=texts[idx], distance=float(dist))
+        for idx, dist in zip(neighbour_ids, distances)
+        if idx in texts
+    ]
+    return SearchResponse(matches=matches)
+
+
+# Async variants for routes on the async session stack. Shard loads and k-NN
+# scans can touch disk and burn CPU, so they run in the threadpool.
+
+async def add_embedding_async(db: AsyncSession, embedding, text: str, owner_id: int) -> AddMemoryResponse:
+    await run_in_threadpool(_load_index_if_needed)
+
+    vec = _as_row_vector(embedding, "Embedding")
+    vec_id = reserve_faiss_ids(None, 1)[0]
+
+    db.add(models.MemoryEmbedding(faiss_id=vec_id, owner_id=owner_id, text=text))
+    await db.commit()
+
+    await run_in_threadpool(index_embeddings, owner_id, vec, [vec_id])
+    return AddMemoryResponse(message="Memory added", faiss_id=vec_id)
+
+
+async def search_embedding_async(db: AsyncSession, embedding, owner_id: int, k: int = 3) -> SearchResponse:
+    await run_in_threadpool(_load_index_if_needed)
+
+    vec = _as_row_vector(embedding, "Query embedding")
+    distances, neighbour_ids = await run_in_threadpool(_search_shard, owner_id, vec, k)
+    if not neighbour_ids:
+        return SearchResponse(matches=[])
+
+    result = await db.execute(
+        select(models.MemoryEmbedding.faiss_id, models.MemoryEmbedding.text).where(
+            models.MemoryEmbedding.faiss_id.in_(neighbour_ids),
+            models.MemoryEmbedding.owner_id == owner_id
+        )
+    )
+    return _matches(result.all(), neighbour_ids, distances)
@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+
+DISABLED_MODELS = {name.strip() for name in os.getenv("DISABLED_MODELS", "").split(",") if name.strip()}
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"
+
+
+class ModelRegistry:
+    """
+    Loads heavy models on first use instead of at import time.
+
+    Each model is registered with a zero-argument loader. ``get`` runs the
+    loader once (other callers wait on the same lock), records how long it
+    took, and returns the cached result afterwards. Names listed in the
+    DISABLED_MODELS env var are never loaded, so workers that only serve
+    non-embedding routes don't pay for them.
+    """
+
+    def __init__(self, disabled=DISABLED_MODELS):
+        self.disabled = set(disabled)
+        self._loaders = {}
+        self._models = {}
+        self._load_seconds = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str):
+        if name in self._models:
+            return self._models[name]
+        if name in self.disabled:
+            raise RuntimeError(f"Model '{name}' is disabled on this worker (DISABLED_MODELS).")
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+
+        with self._locks[name]:
+            if name not in self._models:
+                start = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                self._load_seconds[name] = round(time.perf_counter() - start, 3)
+                print(f"[INFO] Loaded model '{name}' in {self._load_seconds[name]}s")
+        return self._models[name]
+
+    def warm_up(self, names=None):
+        """Load the given (default: all enabled) models on a background thread."""
+        names = [n for n in (names or list(self._loaders)) if n not in self.disabled]
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"[WARN] Warm-up of model '{name}' failed: {e}")
+
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "loaded": name in self._models,
+                "disabled": name in self.disabled,
+                "load_seconds": self._load_seconds.get(name),
+            }
+            for name in self._loaders
+        }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,232 @@
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app import models
+from app.database import SessionLocal
+from app.services import memory_service
+
+PERSISTENCE_MAX_BUFFER = int(os.getenv("PERSISTENCE_MAX_BUFFER", "5000"))
+PERSISTENCE_BATCH_SIZE = int(os.getenv("PERSISTENCE_BATCH_SIZE", "200"))
+PERSISTENCE_FLUSH_INTERVAL_MS = float(os.getenv("PERSISTENCE_FLUSH_INTERVAL_MS", "500"))
+PERSISTENCE_SUBMIT_TIMEOUT = float(os.getenv("PERSISTENCE_SUBMIT_TIMEOUT", "2"))
+
+
+@dataclass
+class GenerationRecord:
+    owner_id: int
+    session_id: str
+    prompt: str
+    content: str
+    model_used: str
+    details: str
+    embedding: object
+    response_time: float
+    prompt_effectiveness: float
+    engagement_score: float
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class PersistenceQueue:
+    """
+    Write-behind buffer for generation results.
+
+    Requests hand off a GenerationRecord and return immediately; a single
+    writer thread drains up to ``batch_size`` records at a time (waiting at
+    most ``flush_interval_ms`` for more) and writes all four tables with
+    bulk inserts in one transaction per batch. Memory vectors are added to
+    the index only after that transaction commits. If a batch hits an
+    integrity error the faiss_id allocator is resynced from the table and
+    the batch is retried one record per transaction; a record whose memory
+    row still fails keeps its content, chat history and analytics rows and
+    only loses the memory. The buffer is bounded: a stalled writer makes
+    producers wait up to ``submit_timeout`` seconds, then the record is
+    dropped and counted rather than blocking the caller forever.
+    """
+
+    def __init__(self, session_factory, max_buffer: int = PERSISTENCE_MAX_BUFFER,
+                 batch_size: int = PERSISTENCE_BATCH_SIZE, flush_interval_ms: float = PERSISTENCE_FLUSH_INTERVAL_MS,
+                 submit_timeout: float = PERSISTENCE_SUBMIT_TIMEOUT):
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.submit_timeout = submit_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_buffer)
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.flushed_batches = 0
+        self.flushed_records = 0
+        self.failed_records = 0
+        self.memory_failures = 0
+        self.dropped_records = 0
+        self.index_failures = 0
+        self.worker_errors = 0
+        self.largest_batch = 0
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+                self._worker.start()
+
+    def submit(self, record: GenerationRecord):
+        self._ensure_worker()
+        try:
+            self._queue.put(record, timeout=self.submit_timeout)
+        except queue.Full:
+            self.dropped_records += 1
+            print(f"[WARN] Persistence buffer full; dropped generation record for user {record.owner_id}.")
+
+    def _drain(self, block: bool):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval) if block else self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 and block else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # Nothing may escape: a dead writer would leave producers waiting on a full buffer
+            try:
+                batch = self._drain(block=True)
+                if batch:
+                    self.flush(batch)
+            except Exception as e:
+                self.worker_errors += 1
+                print(f"[ERROR] Persistence writer error: {e}")
+
+    def _write(self, db, batch: list, with_memory: bool = True) -> list:
+        """Insert the batch and commit; returns the faiss_ids used (none without memory rows)."""
+        faiss_ids = memory_service.reserve_faiss_ids(db, len(batch)) if with_memory else []
+        try:
+            db.execute(insert(models.GeneratedContent), [{
+                "text": r.content,
+                "model_used": r.model_used,
+                "created_at": r.created_at,
+                "owner_id": r.owner_id,
+            } for r in batch])
+            db.execute(insert(models.ChatHistory), [{
+                "session_id": r.session_id,
+                "prompt": r.prompt,
+                "response": r.content,
+                "timestamp": r.created_at,
+                "owner_id": r.owner_id,
+            } for r in batch])
+            if with_memory:
+                db.execute(insert(models.MemoryEmbedding), [{
+                    "faiss_id": faiss_id,
+                    "owner_id": r.owner_id,
+                    "text": r.prompt,
+                } for r, faiss_id in zip(batch, faiss_ids)])
+            db.execute(insert(models.Analytics), [{
+                "event_type": "generate",
+                "details": r.details,
+                "timestamp": r.created_at,
+                "owner_id": r.owner_id,
+                "response_time": r.response_time,
+                "prompt_effectiveness": r.prompt_effectiveness,
+                "engagement_score": r.engagement_score,
+            } for r in batch])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return faiss_ids
+
+    def _write_record(self, db, record: GenerationRecord) -> list:
+        """Write one record; if its memory row still can't be stored, keep the rest of it."""
+        try:
+            return [(record, self._write(db, [record])[0])]
+        except IntegrityError as e:
+            self._write(db, [record], with_memory=False)
+            self.memory_failures += 1
+            print(f"[WARN] Stored generation for user {record.owner_id} without its memory row: {e}")
+            return []
+
+    def flush(self, batch: list):
+        written = []  # (record, faiss_id) pairs that committed
+        persisted = 0
+        db = self.session_factory()
+        try:
+            try:
+                written = list(zip(batch, self._write(db, batch)))
+                persisted = len(batch)
+            except IntegrityError as e:
+                # Usually a faiss_id collision with rows another writer inserted; the
+                # in-process counter is stale, so move it past the table before retrying.
+                print(f"[WARN] Batch of {len(batch)} hit an integrity error, retrying per record: {e}")
+                memory_service.resync_faiss_ids(db)
+                for record in batch:
+                    try:
+                        written.extend(self._write_record(db, record))
+                        persisted += 1
+                    except Exception as record_error:
+                        self.failed_records += 1
+                        print(f"[ERROR] Failed to persist generation record for user {record.owner_id}: {record_error}")
+        except Exception as e:
+            self.failed_records += len(batch) - persisted
+            print(f"[ERROR] Failed to persist {len(batch) - persisted} generation records: {e}")
+        finally:
+            db.close()
+
+        by_owner = {}
+        for r, faiss_id in written:
+            by_owner.setdefault(r.owner_id, ([], []))
+            by_owner[r.owner_id][0].append(r.embedding)
+            by_owner[r.owner_id][1].append(faiss_id)
+        for owner_id, (vectors, ids) in by_owner.items():
+            # Rows are already committed; a failed shard append only costs that user's search recall
+            try:
+                memory_service.index_embeddings(owner_id, vectors, ids)
+            except Exception as e:
+                self.index_failures += len(ids)
+                print(f"[ERROR] Failed to index {len(ids)} memory vectors for user {owner_id}: {e}")
+
+        if persisted:
+            self.flushed_batches += 1
+        self.flushed_records += persisted
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the writer and flush whatever is still buffered."""
+        self._stopping.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                break
+            self.flush(batch)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_buffer": self._queue.maxsize,
+            "batch_size": self.batch_size,
+            "flushed_batches": self.flushed_batches,
+            "flushed_records": self.flushed_records,
+            "failed_records": self.failed_records,
+            "memory_failures": self.memory_failures,
+            "dropped_records": self.dropped_records,
+            "index_failures": self.index_failures,
+            "worker_errors": self.worker_errors,
+            "largest_batch": self.largest_batch,
+        }
+
+
+persistence_queue = PersistenceQueue(SessionLocal)
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import time
+from app import models
+from app.utils.ttl_cache import TTLCache
+
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))  # 0 disables the cache
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+USER_COLUMNS = [column.key for column in models.User.__table__.columns]
+
+
+class PrincipalCache:
+    """
+    Token -> user cache for the auth dependencies.
+
+    A hit skips both the JWT decode and the user lookup. Entries live for
+    at most ``ttl`` seconds and never past the token's own ``exp``, and the
+    cache holds ``max_entries`` tokens in LRU order. It stores column
+    values, not ORM objects, so every hit gets a fresh transient ``User``
+    that no other request or session shares; routes that modify the user
+    must load it into their own session and call ``invalidate_user``.
+    """
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, max_entries: int = AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Wall clock, so an entry's deadline can be capped at the token's exp
+        self._entries = TTLCache(max_entries, ttl, clock=time.time)  # token digest -> (user_id, values)
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        if self.ttl <= 0:
+            return None
+        entry = self._entries.get(self._key(token))
+        if entry is None:
+            return None
+        return models.User(**entry[1])
+
+    def put(self, token: str, user, token_exp=None):
+        if self.ttl <= 0:
+            return
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, float(token_exp) - time.time())
+        values = {column: getattr(user, column) for column in USER_COLUMNS}
+        self._entries.put(self._key(token), (user.id, values), ttl=ttl)
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token for this user (profile or role changed)."""
+        self.invalidations += self._entries.discard_where(lambda key, entry: entry[0] == user_id)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        cache = self._entries.stats()
+        return {
+            "entries": cache["entries"],
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+            "hit_rate": cache["hit_rate"],
+            "evictions": cache["evictions"],
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache()
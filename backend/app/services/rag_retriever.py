@@ -1,28 +1,54 @@
 # app/services/rag_retriever.py
 import json
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
+import os
+from app.services.model_registry import registry
+from app.utils.passage_store import PassageStore
 
 INDEX_PATH = "training/faiss_index.index"
-TEXTS_PATH = "training/faiss_texts.json"
+PASSAGES_PATH = "training/faiss_passages"
+TEXTS_PATH = "training/faiss_texts.json"  # legacy output of older rag_indexer builds
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
-index = faiss.read_index(INDEX_PATH)
+# Search-time knobs for approximate indexes built by training/rag_indexer.py (ignored by a flat index)
+RAG_NPROBE = int(os.getenv("RAG_NPROBE", "16"))
+RAG_EF_SEARCH = int(os.getenv("RAG_EF_SEARCH", "64"))
 
-with open(TEXTS_PATH, "r", encoding="utf-8") as f:
-    texts = json.load(f)
+def _load_rag():
+    import faiss
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    # read_index restores whatever type was built (Flat, IVF, HNSW, IVF-PQ)
+    index = faiss.read_index(INDEX_PATH)
+    params = faiss.ParameterSpace()
+    if faiss.try_extract_index_ivf(index) is not None:
+        params.set_index_parameter(index, "nprobe", RAG_NPROBE)
+    if hasattr(faiss.downcast_index(index), "hnsw"):
+        params.set_index_parameter(index, "efSearch", RAG_EF_SEARCH)
+    # Memory-mapped, so workers share the pages and nothing is parsed at startup
+    if PassageStore.exists(PASSAGES_PATH):
+        texts = PassageStore(PASSAGES_PATH)
+    else:
+        print(f"[WARN] {PASSAGES_PATH} not found, loading {TEXTS_PATH} into memory. Rebuild with `python -m training.rag_indexer`.")
+        with open(TEXTS_PATH, "r", encoding="utf-8") as f:
+            texts = json.load(f)
+    if len(texts) != index.ntotal:
+        print(f"[WARN] RAG index holds {index.ntotal} vectors but {len(texts)} passages.")
+    return model, index, texts
+
+registry.register("rag", _load_rag)
 
 # ✅ Lower = more similar (distance, not cosine similarity directly)
 SIMILARITY_THRESHOLD = 0.5  # Adjust this value as needed (typically between 0.3 and 0.8)
 
 def retrieve_similar_passages(query: str, k: int = 3):
+    model, index, texts = registry.get("rag")
     emb = model.encode([query]).astype("float32")
     distances, indices = index.search(emb, k)
 
     results = []
     for dist, idx in zip(distances[0], indices[0]):
-        if dist < SIMILARITY_THRESHOLD:
+        # Approximate indexes return -1 when fewer than k neighbours were probed
+        if 0 <= idx < len(texts) and dist < SIMILARITY_THRESHOLD:
             results.append(texts[idx]) 
     
     return results
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from app.utils.ttl_cache import TTLCache
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "0") == "1"
+RESPONSE_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SEMANTIC_THRESHOLD", "0.95"))
+RESPONSE_CACHE_SEMANTIC_PER_USER = int(os.getenv("RESPONSE_CACHE_SEMANTIC_PER_USER", "200"))
+
+
+def normalize_messages(messages: list) -> list:
+    return [{"role": m["role"], "content": " ".join(m["content"].split())} for m in messages]
+
+
+class ResponseCache:
+    """
+    Per-user cache of completed generations.
+
+    The exact tier is keyed by (owner, model, normalized messages) and holds
+    at most ``max_entries`` completions in LRU order. The optional semantic
+    tier keeps each user's recent prompt embeddings and serves a cached
+    completion when a new prompt's cosine similarity reaches ``threshold``.
+    The embedding only describes the latest prompt, so the semantic tier is
+    used for first-turn requests only; a follow-up such as "expand on that"
+    must not match a reply written for some other conversation.
+    Entries in both tiers expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 semantic: bool = RESPONSE_CACHE_SEMANTIC, threshold: float = RESPONSE_CACHE_SEMANTIC_THRESHOLD,
+                 semantic_per_user: int = RESPONSE_CACHE_SEMANTIC_PER_USER):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic = semantic
+        self.threshold = threshold
+        self.semantic_per_user = semantic_per_user
+        self._exact = TTLCache(max_entries, ttl)  # exact key -> content
+        self._semantic = {}  # owner_id -> OrderedDict[(model, exact key)] -> (expires, unit vector, content)
+        self._lock = threading.Lock()
+        self.semantic_hits = 0
+        self.misses = 0
+        self.semantic_evictions = 0
+        self.semantic_expirations = 0
+
+    def _key(self, owner_id: int, model: str, messages: list) -> str:
+        raw = json.dumps([owner_id, model, normalize_messages(messages)], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype="float32").reshape(-1)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _semantic_eligible(self, messages: list, embedding) -> bool:
+        return self.semantic and embedding is not None and len(messages) == 1
+
+    def get(self, owner_id: int, model: str, messages: list, embedding=None):
+        now = time.monotonic()
+        key = self._key(owner_id, model, messages)
+        content = self._exact.get(key)
+        if content is not None:
+            return content
+        with self._lock:
+            if self._semantic_eligible(messages, embedding):
+                content = self._semantic_lookup(owner_id, model, self._unit(embedding), now)
+                if content is not None:
+                    self.semantic_hits += 1
+                    return content
+
+            self.misses += 1
+            return None
+
+    def _semantic_lookup(self, owner_id: int, model: str, query, now: float):
+        entries = self._semantic.get(owner_id)
+        if not entries:
+            return None
+        for entry_key in [k for k, v in entries.items() if v[0] <= now]:
+            del entries[entry_key]
+            self.semantic_expirations += 1
+
+        candidates = [(k, v) for k, v in entries.items() if k[0] == model]
+        if not candidates:
+            return None
+        similarities = np.stack([v[1] for _, v in candidates]) @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        entries.move_to_end(candidates[best][0])
+        return candidates[best][1][2]
+
+    def put(self, owner_id: int, model: str, messages: list, content: str, embedding=None):
+        if not content:
+            return
+        expires = time.monotonic() + self.ttl
+        key = self._key(owner_id, model, messages)
+        self._exact.put(key, content)
+        if self._semantic_eligible(messages, embedding):
+            with self._lock:
+                entries = self._semantic.setdefault(owner_id, OrderedDict())
+                entries[(model, key)] = (expires, self._unit(embedding), content)
+                entries.move_to_end((model, key))
+                while len(entries) > self.semantic_per_user:
+                    entries.popitem(last=False)
+                    self.semantic_evictions += 1
+
+    def stats(self) -> dict:
+        exact = self._exact.stats()
+        with self._lock:
+            lookups = exact["hits"] + self.semantic_hits + self.misses
+            return {
+                "entries": exact["entries"],
+                "semantic_entries": sum(len(e) for e in self._semantic.values()),
+                "semantic_enabled": self.semantic,
+                "exact_hits": exact["hits"],
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": exact["evictions"] + self.semantic_evictions,
+                "expirations": exact["expirations"] + self.semantic_expirations,
+                "hit_rate": round((exact["hits"] + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+RETRIEVAL_MAX_QUEUE = int(os.getenv("RETRIEVAL_MAX_QUEUE", "64"))
+
+
+class ExecutorSaturated(Exception):
+    pass
+
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking pre-generation work (embedding + k-NN + SQLite).
+
+    Keeps that work off the event loop, and admits at most ``max_workers``
+    running plus ``max_queue`` waiting jobs; beyond that ``run`` raises
+    ExecutorSaturated immediately so the route can shed load instead of
+    letting latency grow without bound.
+    """
+
+    def __init__(self, max_workers: int = RETRIEVAL_WORKERS, max_queue: int = RETRIEVAL_MAX_QUEUE,
+                 name: str = "retrieval"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.in_flight} jobs already in flight")
+            self.in_flight += 1
+
+        submitted = time.perf_counter()
+
+        def job():
+            with self._lock:
+                self.active += 1
+                self.total_wait += time.perf_counter() - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, job)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queue_depth": self.in_flight - self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_queue_wait_ms": round(self.total_wait / started * 1000, 2) if started else 0.0,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+retrieval_executor = BoundedExecutor()
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List
+from app import models
+from app.database import SessionLocal
+from app.services.context_builder import message_tokens
+
+SESSION_BUFFER_TOKENS = int(os.getenv("SESSION_BUFFER_TOKENS", "3000"))
+SESSION_BUFFER_SIZE = int(os.getenv("SESSION_BUFFER_SIZE", "50"))  # hard cap on messages per session
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_MAX_TOTAL_MESSAGES = int(os.getenv("SESSION_MAX_TOTAL_MESSAGES", "100000"))
+
+
+class _SessionBuffer:
+    __slots__ = ("messages", "tokens", "token_total", "last_access")
+
+    def __init__(self, buffer_size: int):
+        self.messages = deque(maxlen=buffer_size)
+        self.tokens = deque(maxlen=buffer_size)
+        self.token_total = 0
+        self.last_access = time.monotonic()
+
+    def append(self, message: Dict[str, str], max_tokens: int):
+        if len(self.tokens) == self.tokens.maxlen:
+            self.token_total -= self.tokens[0]
+        cost = message_tokens(message)
+        self.messages.append(message)
+        self.tokens.append(cost)
+        self.token_total += cost
+        # Slide the window by tokens, but always keep the newest message
+        while self.token_total > max_tokens and len(self.messages) > 1:
+            self.messages.popleft()
+            self.token_total -= self.tokens.popleft()
+
+
+class SessionMemoryStore:
+    """
+    Sliding-window chat buffers per (owner, session), bounded in every direction.
+
+    Each session keeps its most recent messages that fit in ``max_tokens``
+    (and at most ``buffer_size`` of them) in a deque. Sessions
+    idle longer than ``idle_ttl`` seconds are dropped, and the least recently
+    used ones go first whenever ``max_sessions`` or ``max_total_messages`` is
+    exceeded. A session that isn't resident (evicted, or served by another
+    worker) is rehydrated from the chat_history table on first access.
+    """
+
+    def __init__(self, session_factory, max_tokens: int = SESSION_BUFFER_TOKENS, buffer_size: int = SESSION_BUFFER_SIZE,
+                 idle_ttl: float = SESSION_IDLE_TTL, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_total_messages: int = SESSION_MAX_TOTAL_MESSAGES):
+        self.session_factory = session_factory
+        self.max_tokens = max_tokens
+        self.buffer_size = buffer_size
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_total_messages = max_total_messages
+        self._sessions: "OrderedDict[tuple, _SessionBuffer]" = OrderedDict()
+        self._total_messages = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.rehydrations = 0
+        self.idle_evictions = 0
+        self.lru_evictions = 0
+
+    def _load_history(self, owner_id: int, session_id: str) -> List[Dict[str, str]]:
+        turns = (self.buffer_size + 1) // 2
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(models.ChatHistory.prompt, models.ChatHistory.response)
+                .filter(models.ChatHistory.owner_id == owner_id,
+                        models.ChatHistory.session_id == session_id)
+                .order_by(models.ChatHistory.timestamp.desc())
+                .limit(turns)
+                .all()
+            )
+        finally:
+            db.close()
+
+        messages = []
+        for row in reversed(rows):
+            messages.append({"role": "user", "content": row.prompt})
+            messages.append({"role": "assistant", "content": row.response})
+        return messages
+
+    def _evict(self, now: float):
+        while self._sessions:
+            key, buffer = next(iter(self._sessions.items()))
+            if now - buffer.last_access > self.idle_ttl:
+                self.idle_evictions += 1
+            elif len(self._sessions) > self.max_sessions or self._total_messages > self.max_total_messages:
+                self.lru_evictions += 1
+            else:
+                break
+            self._sessions.popitem(last=False)
+            self._total_messages -= len(buffer.messages)
+
+    def _get_buffer(self, owner_id: int, session_id: str) -> _SessionBuffer:
+        key = (owner_id, session_id)
+        with self._lock:
+            buffer = self._sessions.get(key)
+            if buffer is not None:
+                self.hits += 1
+                buffer.last_access = time.monotonic()
+                self._sessions.move_to_end(key)
+                return buffer
+
+        # Rehydrate (and count tokens) outside the lock so a slow query doesn't stall other sessions
+        rehydrated = _SessionBuffer(self.buffer_size)
+        for message in self._load_history(owner_id, session_id):
+            rehydrated.append(message, self.max_tokens)
+
+        with self._lock:
+            buffer = self._sessions.get(key)
+            if buffer is None:
+                buffer = rehydrated
+                self._sessions[key] = buffer
+                self._total_messages += len(buffer.messages)
+                self.rehydrations += 1
+            buffer.last_access = time.monotonic()
+            self._sessions.move_to_end(key)
+            return buffer
+
+    def add_message(self, owner_id: int, session_id: str, role: str, content: str):
+        buffer = self._get_buffer(owner_id, session_id)
+        with self._lock:
+            before = len(buffer.messages)
+            buffer.append({"role": role, "content": content}, self.max_tokens)
+            if (owner_id, session_id) in self._sessions:
+                self._total_messages += len(buffer.messages) - before
+            self._evict(time.monotonic())
+
+    def get_messages(self, owner_id: int, session_id: str) -> List[Dict[str, str]]:
+        buffer = self._get_buffer(owner_id, session_id)
+        with self._lock:
+            return list(buffer.messages)
+
+    def drop(self, owner_id: int, session_id: str):
+        """Forget a session's buffer, e.g. after its history was deleted."""
+        with self._lock:
+            buffer = self._sessions.pop((owner_id, session_id), None)
+            if buffer is not None:
+                self._total_messages -= len(buffer.messages)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "messages": self._total_messages,
+                "max_tokens_per_session": self.max_tokens,
+                "max_sessions": self.max_sessions,
+                "max_total_messages": self.max_total_messages,
+                "hits": self.hits,
+                "rehydrations": self.rehydrations,
+                "idle_evictions": self.idle_evictions,
+                "lru_evictions": self.lru_evictions,
+            }
+
+
+session_memory = SessionMemoryStore(SessionLocal)
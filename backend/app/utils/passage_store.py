@@ -0,0 +1,110 @@
+import mmap
+import os
+import numpy as np
+
+OFFSETS_SUFFIX = ".offsets"
+BLOB_SUFFIX = ".blob"
+
+
+class PassageWriter:
+    """
+    Append-only writer for a passage store at ``path``.
+
+    Passages are concatenated as UTF-8 into ``<path>.blob`` and the end
+    offset of each one is appended to ``<path>.offsets`` (uint64), so
+    passage ``i`` is ``blob[offsets[i-1]:offsets[i]]``.
+
+    ``truncate(count)`` cuts both files back to the first ``count``
+    passages, which lets a resumed build discard anything written after
+    its last checkpoint.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offsets = open(path + OFFSETS_SUFFIX, "a+b")
+        self._blob = open(path + BLOB_SUFFIX, "a+b")
+        self._count = os.path.getsize(path + OFFSETS_SUFFIX) // 8
+        self._end = self._read_end(self._count)
+
+    def _read_end(self, count: int) -> int:
+        if count == 0:
+            return 0
+        self._offsets.seek((count - 1) * 8)
+        return int(np.frombuffer(self._offsets.read(8), dtype="uint64")[0])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def truncate(self, count: int):
+        if count > self._count:
+            raise ValueError(f"Cannot truncate {self._count} passages to {count}")
+        self._end = self._read_end(count)
+        self._count = count
+        self._offsets.truncate(count * 8)
+        self._blob.truncate(self._end)
+
+    def add(self, passages):
+        ends = []
+        chunks = []
+        for passage in passages:
+            data = passage.encode("utf-8")
+            self._end += len(data)
+            chunks.append(data)
+            ends.append(self._end)
+        # Blob first: a crash between the writes leaves offsets that never point past the data
+        self._blob.seek(0, os.SEEK_END)
+        self._blob.write(b"".join(chunks))
+        self._offsets.seek(0, os.SEEK_END)
+        self._offsets.write(np.asarray(ends, dtype="uint64").tobytes())
+        self._count += len(ends)
+
+    def flush(self):
+        self._blob.flush()
+        self._offsets.flush()
+
+    def close(self):
+        self._blob.close()
+        self._offsets.close()
+
+
+class PassageStore:
+    """
+    Read-only, memory-mapped view of a store written by ``PassageWriter``.
+
+    Nothing is parsed on open; lookups by position are O(1) slices of the
+    mapped blob, and the pages are shared by every process that maps the
+    same files.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        offsets_path, blob_path = path + OFFSETS_SUFFIX, path + BLOB_SUFFIX
+        count = os.path.getsize(offsets_path) // 8
+        blob_size = os.path.getsize(blob_path)
+
+        self._offsets = np.memmap(offsets_path, dtype="uint64", mode="r", shape=(count,)) if count else np.empty(0, dtype="uint64")
+        # Ignore a torn tail whose offsets point past the end of the blob
+        self._count = int(np.searchsorted(self._offsets, blob_size, side="right"))
+
+        self._file = open(blob_path, "rb")
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if blob_size else b""
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return os.path.exists(path + OFFSETS_SUFFIX) and os.path.exists(path + BLOB_SUFFIX)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(f"Passage {i} out of range (store holds {self._count})")
+        start = int(self._offsets[i - 1]) if i else 0
+        return self._blob[start:int(self._offsets[i])].decode("utf-8")
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
@@ -0,0 +1,148 @@
+import os
+import threading
+import numpy as np
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.i64"
+
+
+class VectorIndex:
+    """
+    Append-only exact L2 index over a preallocated float32 matrix.
+
+    Rows are written into spare capacity and the buffer doubles when full,
+    so adds are O(1) amortized and searches never wait on a refit.
+
+    When a ``path`` is given, every add is also appended to a raw snapshot
+    in that directory (``vectors.f32`` rows plus the matching ``ids.i64``),
+    which ``VectorIndex.load`` memory-maps back in on startup.
+
+    Adds take the index's own lock. Rows below the current size are never
+    rewritten (growth copies into a new buffer), so a search only holds the
+    lock long enough to snapshot those rows and scans them unlocked.
+    """
+
+    def __init__(self, dimension: int, initial_capacity: int = 1024, path: str = None):
+        self.dimension = dimension
+        self.path = path
+        self._vectors = np.empty((max(initial_capacity, 1), dimension), dtype="float32")
+        self._ids = np.empty(max(initial_capacity, 1), dtype="int64")
+        self._norms = np.empty(max(initial_capacity, 1), dtype="float32")
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, dimension: int):
+        """Map a snapshot written by a previous process back into a new index."""
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        ids_path = os.path.join(path, IDS_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(ids_path)):
+            return cls(dimension, path=path)
+
+        row_bytes = dimension * 4
+        # A crash between the two appends can leave one file a row ahead; keep the common prefix.
+        rows = min(os.path.getsize(vectors_path) // row_bytes, os.path.getsize(ids_path) // 8)
+        index = cls(dimension, initial_capacity=max(rows, 1024), path=path)
+        if rows:
+            vectors = np.memmap(vectors_path, dtype="float32", mode="r", shape=(rows, dimension))
+            ids = np.memmap(ids_path, dtype="int64", mode="r", shape=(rows,))
+            index._append(vectors, ids)
+            del vectors, ids
+
+        with open(vectors_path, "r+b") as f:
+            f.truncate(rows * row_bytes)
+        with open(ids_path, "r+b") as f:
+            f.truncate(rows * 8)
+        return index
+
+    def max_id(self) -> int:
+        return int(self._ids[:self._size].max()) if self._size else -1
+
+    def arrays(self):
+        """Read-only views of the stored (vectors, ids)."""
+        with self._lock:
+            vectors, ids = self._vectors[:self._size], self._ids[:self._size]
+        vectors.flags.writeable = False
+        ids.flags.writeable = False
+        return vectors, ids
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, capacity: int):
+        if capacity <= len(self._ids):
+            return
+        new_capacity = len(self._ids)
+        while new_capacity < capacity:
+            new_capacity *= 2
+
+        vectors = np.empty((new_capacity, self.dimension), dtype="float32")
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.empty(new_capacity, dtype="int64")
+        ids[:self._size] = self._ids[:self._size]
+        norms = np.empty(new_capacity, dtype="float32")
+        norms[:self._size] = self._norms[:self._size]
+
+        self._vectors, self._ids, self._norms = vectors, ids, norms
+
+    def add(self, vectors, ids):
+        vectors = np.asarray(vectors, dtype="float32")
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        ids = np.asarray(ids, dtype="int64").reshape(-1)
+
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of shape (n, {self.dimension}), got {vectors.shape}")
+        if vectors.shape[0] != ids.shape[0]:
+            raise ValueError(f"Got {vectors.shape[0]} vectors but {ids.shape[0]} ids")
+
+        with self._lock:
+            if self.path:
+                os.makedirs(self.path, exist_ok=True)
+                with open(os.path.join(self.path, VECTORS_FILE), "ab") as f:
+                    f.write(np.ascontiguousarray(vectors).tobytes())
+                with open(os.path.join(self.path, IDS_FILE), "ab") as f:
+                    f.write(ids.tobytes())
+
+            self._append(vectors, ids)
+
+    def _append(self, vectors, ids):
+        n = vectors.shape[0]
+        self._reserve(self._size + n)
+        end = self._size + n
+        self._vectors[self._size:end] = vectors
+        self._ids[self._size:end] = ids
+        self._norms[self._size:end] = np.einsum("ij,ij->i", vectors, vectors)
+        self._size = end
+
+    def search(self, query, k: int = 3):
+        """Return (distances, ids) of the k nearest rows by euclidean distance."""
+        query = np.asarray(query, dtype="float32").reshape(-1)
+        if query.shape[0] != self.dimension:
+            raise ValueError(f"Expected query of dimension {self.dimension}, got {query.shape[0]}")
+
+        with self._lock:
+            size = self._size
+            vectors, ids, norms = self._vectors[:size], self._ids[:size], self._norms[:size]
+
+        k = min(k, size)
+        if k <= 0:
+            return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+
+        # Screen with ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2 over the cached row norms. The
+        # expansion cancels badly in float32 (a self-match can come out well above 0), so the
+        # shortlist is re-ranked on exact float64 distances. It is oversampled to 2k so rows
+        # the screen misorders around the k-th place still get re-ranked.
+        sq_dist = norms - 2.0 * (vectors @ query)
+        sq_dist += float(query @ query)
+
+        candidates = min(2 * k, size)
+        if candidates < size:
+            top = np.argpartition(sq_dist, candidates - 1)[:candidates]
+        else:
+            top = np.arange(size)
+
+        diff = vectors[top].astype("float64") - query
+        exact = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+        order = np.argsort(exact, kind="stable")[:k]
+        return exact[order].astype("float32"), ids[top[order]].copy()
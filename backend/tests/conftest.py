@@ -0,0 +1,34 @@
+# tests/conftest.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Sessions on a fresh SQLite file with every table created."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    models.Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def memory_index(tmp_path, monkeypatch, session_factory):
+    """memory_service pointed at a private index directory and database, with no shards resident."""
+    from app.services import memory_service
+
+    monkeypatch.setattr(memory_service, "MEMORY_INDEX_DIR", str(tmp_path / "memory_index"))
+    monkeypatch.setattr(memory_service, "SessionLocal", session_factory)
+    monkeypatch.setattr(memory_service, "index_loaded", False)
+    monkeypatch.setattr(memory_service, "next_faiss_id", 0)
+    monkeypatch.setattr(memory_service, "index_owner_file", None)
+    memory_service.shards.clear()
+    memory_service.owner_locks.clear()
+    yield memory_service
+    if memory_service.index_owner_file is not None:
+        memory_service.index_owner_file.close()
+    memory_service.shards.clear()
+    memory_service.owner_locks.clear()
@@ -0,0 +1,58 @@
+# tests/test_context_builder.py
+import pytest
+
+from app.schemas import Match
+from app.services import context_builder
+from app.services.context_builder import build_context, MESSAGE_OVERHEAD_TOKENS
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(context_builder, "count_tokens", lambda text: len(text.split()))
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def cost(text):
+    return len(text.split()) + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_packs_memories_closest_first_and_skips_duplicates():
+    prompt = "how do I bake sourdough bread"
+    memories = [
+        Match(faiss_id=1, text="sourdough needs a mature starter", distance=0.5),
+        Match(faiss_id=2, text="How do I bake sourdough bread?", distance=0.1),  # repeats the prompt
+        Match(faiss_id=3, text="proof the dough overnight in the fridge", distance=0.2),
+        Match(faiss_id=4, text="proof the dough overnight in the fridge", distance=0.3),  # repeats memory 3
+        Match(faiss_id=5, text="", distance=0.0),
+    ]
+
+    messages, tokens = build_context(memories, [user(prompt)], budget=1000)
+
+    assert [m["content"] for m in messages] == [
+        "proof the dough overnight in the fridge",
+        "sourdough needs a mature starter",
+        prompt,
+    ]
+    assert tokens == sum(cost(m["content"]) for m in messages)
+
+
+def test_memory_share_and_budget():
+    history = [user("old question"), {"role": "assistant", "content": "old answer"}, user("new question here")]
+    memories = [Match(faiss_id=i, text=f"memory number {i} " + "word " * 5, distance=i) for i in range(5)]
+    budget = cost("new question here") + 2 * cost(memories[0].text) + cost("old answer")
+
+    messages, tokens = build_context(memories, history, budget=budget, memory_share=0.7)
+
+    # Memories stop at their share of the budget; the newest older turn fits in what is left
+    assert [m["content"] for m in messages] == [memories[0].text, memories[1].text, "old answer", "new question here"]
+    assert tokens <= budget
+
+
+def test_current_prompt_is_always_kept():
+    messages, tokens = build_context([], [user("a b c d e f")], budget=1)
+    assert messages == [user("a b c d e f")]
+    assert tokens == cost("a b c d e f")
+    assert build_context([], []) == ([], 0)
@@ -0,0 +1,96 @@
+# tests/test_groq_client.py
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.groq_client import GroqStreamClient, GroqAPIError
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Groq chat completions SSE endpoint."""
+
+    protocol_version = "HTTP/1.1"
+    responses = []  # queued (status, pieces) per request
+    payloads = []
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        FakeGroqHandler.payloads.append(json.loads(self.rfile.read(length)))
+        status, pieces = FakeGroqHandler.responses.pop(0)
+
+        if status != 200:
+            body = b'{"error": "upstream unavailable"}'
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [json.dumps({"choices": [{"delta": {"content": p}}]}) for p in pieces] + ["[DONE]"]
+        for event in events:
+            data = f"data: {event}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_groq():
+    FakeGroqHandler.responses = []
+    FakeGroqHandler.payloads = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGroqHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/openai/v1/chat/completions"
+    server.shutdown()
+    server.server_close()
+
+
+def collect(client, messages):
+    async def run():
+        try:
+            stream = await client.stream_chat(messages)
+            return [piece async for piece in stream]
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_streams_content_pieces(fake_groq):
+    FakeGroqHandler.responses = [(200, ["Hello", ", ", "world"])]
+    client = GroqStreamClient(fake_groq, "test-key", "test-model", http2=False)
+
+    pieces = collect(client, [{"role": "user", "content": "hi"}])
+
+    assert "".join(pieces) == "Hello, world"
+    assert FakeGroqHandler.payloads[0]["model"] == "test-model"
+    assert FakeGroqHandler.payloads[0]["stream"] is True
+
+
+def test_retries_retryable_status_before_streaming(fake_groq):
+    FakeGroqHandler.responses = [(503, []), (200, ["ok"])]
+    client = GroqStreamClient(fake_groq, "test-key", "test-model", http2=False, max_retries=2, backoff=0)
+
+    assert collect(client, [{"role": "user", "content": "hi"}]) == ["ok"]
+    assert len(FakeGroqHandler.payloads) == 2
+
+
+def test_raises_on_client_error(fake_groq):
+    FakeGroqHandler.responses = [(400, [])]
+    client = GroqStreamClient(fake_groq, "test-key", "test-model", http2=False, backoff=0)
+
+    with pytest.raises(GroqAPIError) as exc:
+        collect(client, [{"role": "user", "content": "hi"}])
+    assert exc.value.status_code == 400
+    assert len(FakeGroqHandler.payloads) == 1
@@ -0,0 +1,45 @@
+# tests/test_memory_service.py
+import numpy as np
+import pytest
+
+
+def vector(seed):
+    return np.random.default_rng(seed).standard_normal(384).astype("float32")
+
+
+def test_evicted_shard_reloads_from_disk(memory_index, session_factory, monkeypatch):
+    monkeypatch.setattr(memory_index, "MAX_RESIDENT_SHARDS", 1)
+    monkeypatch.setattr(memory_index, "shard_evictions", 0)
+    db = session_factory()
+    try:
+        first = memory_index.add_embedding(db, vector(1), "owner one", owner_id=1).faiss_id
+        memory_index.add_embedding(db, vector(2), "owner two", owner_id=2)
+
+        assert list(memory_index.shards) == [2]
+        assert memory_index.shard_evictions == 1
+
+        result = memory_index.search_embedding(db, vector(1), owner_id=1, k=3)
+        assert [(m.faiss_id, m.text) for m in result.matches] == [(first, "owner one")]
+        assert result.matches[0].distance == 0.0
+        assert list(memory_index.shards) == [1]
+
+        # Owners never see each other's memories
+        assert [m.text for m in memory_index.search_embedding(db, vector(1), owner_id=2).matches] == ["owner two"]
+    finally:
+        db.close()
+
+
+def test_index_dir_is_claimed_by_one_process(memory_index, session_factory):
+    db = session_factory()
+    try:
+        memory_index.load_index(db)
+    finally:
+        db.close()
+
+    held = memory_index.index_owner_file
+    memory_index.index_owner_file = None  # look like a second process opening the same directory
+    try:
+        with pytest.raises(memory_index.IndexInUseError):
+            memory_index._claim_index_dir()
+    finally:
+        memory_index.index_owner_file = held
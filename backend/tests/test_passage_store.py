@@ -0,0 +1,38 @@
+# tests/test_passage_store.py
+from app.utils.passage_store import PassageStore, PassageWriter
+
+
+def test_round_trip_and_truncate(tmp_path):
+    path = str(tmp_path / "passages")
+    writer = PassageWriter(path)
+    writer.add(["first", "", "naïve ✅ unicode"])
+    writer.add(["fourth"])
+    writer.truncate(3)  # drop everything after a "checkpoint"
+    writer.add(["replacement"])
+    writer.close()
+
+    store = PassageStore(path)
+    assert len(store) == 4
+    assert [store[i] for i in range(4)] == ["first", "", "naïve ✅ unicode", "replacement"]
+    assert store[-1] == "replacement"
+    store.close()
+
+    # Reopening for append continues after the existing passages
+    writer = PassageWriter(path)
+    assert len(writer) == 4
+    writer.add(["fifth"])
+    writer.close()
+    assert PassageStore(path)[4] == "fifth"
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    path = str(tmp_path / "passages")
+    writer = PassageWriter(path)
+    writer.add(["alpha", "beta"])
+    writer.close()
+    with open(path + ".blob", "r+b") as f:
+        f.truncate(7)  # lose part of "beta"
+
+    store = PassageStore(path)
+    assert len(store) == 1
+    assert store[0] == "alpha"
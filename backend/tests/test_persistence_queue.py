@@ -0,0 +1,77 @@
+# tests/test_persistence_queue.py
+import numpy as np
+
+from app import models
+from app.services.persistence_queue import GenerationRecord, PersistenceQueue
+
+
+def record(i, owner_id=1):
+    embedding = np.random.default_rng(i).standard_normal(384).astype("float32")
+    return GenerationRecord(owner_id, "s", f"prompt {i}", f"content {i}", "model", "details", embedding, 1.0, 0.5, 0.5)
+
+
+def row_counts(session_factory, owner_id=1):
+    db = session_factory()
+    try:
+        return {
+            table.__tablename__: db.query(table).filter(table.owner_id == owner_id).count()
+            for table in (models.GeneratedContent, models.ChatHistory, models.MemoryEmbedding, models.Analytics)
+        }
+    finally:
+        db.close()
+
+
+def test_batch_writes_every_table_and_indexes(memory_index, session_factory):
+    queue = PersistenceQueue(session_factory)
+    queue.flush([record(i) for i in range(3)])
+
+    assert set(row_counts(session_factory).values()) == {3}
+    assert len(memory_index.get_shard(1)) == 3
+    stats = queue.stats()
+    assert (stats["flushed_batches"], stats["flushed_records"], stats["failed_records"]) == (1, 3, 0)
+
+
+def test_faiss_id_collision_resyncs_and_keeps_records(memory_index, session_factory):
+    # Rows inserted by another writer after the allocator was initialised (e.g. a bulk ingest)
+    db = session_factory()
+    memory_index.load_index(db)
+    db.add_all([models.MemoryEmbedding(faiss_id=i, owner_id=9, text="ingested") for i in range(10)])
+    db.commit()
+    db.close()
+
+    queue = PersistenceQueue(session_factory)
+    queue.flush([record(i) for i in range(3)])
+
+    assert set(row_counts(session_factory).values()) == {3}
+    stats = queue.stats()
+    assert (stats["flushed_records"], stats["failed_records"], stats["memory_failures"]) == (3, 0, 0)
+    _, ids = memory_index.get_shard(1).arrays()
+    assert sorted(ids.tolist()) == [10, 11, 12]
+
+
+def test_memory_row_failure_keeps_chat_history(memory_index, session_factory, monkeypatch):
+    db = session_factory()
+    db.add(models.MemoryEmbedding(faiss_id=0, owner_id=9, text="taken"))
+    db.commit()
+    db.close()
+    # An allocator that keeps handing out a taken id
+    monkeypatch.setattr(memory_index, "reserve_faiss_ids", lambda db, count: [0] * count)
+
+    queue = PersistenceQueue(session_factory)
+    queue.flush([record(0)])
+
+    counts = row_counts(session_factory)
+    assert counts["memory_embeddings"] == 0
+    assert counts["chat_history"] == counts["generated_content"] == counts["analytics"] == 1
+    assert queue.stats()["memory_failures"] == 1
+    assert queue.stats()["flushed_records"] == 1
+
+
+def test_stop_flushes_buffered_records(memory_index, session_factory):
+    queue = PersistenceQueue(session_factory, flush_interval_ms=200)
+    for i in range(5):
+        queue.submit(record(i))
+    queue.stop()
+
+    assert set(row_counts(session_factory).values()) == {5}
+    assert queue.stats()["queued"] == 0
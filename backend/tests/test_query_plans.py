@@ -0,0 +1,61 @@
+# tests/test_query_plans.py
+import re
+
+import pytest
+from sqlalchemy import create_engine, delete, func, select
+
+from app import models
+from app.services.analytics_dashboard import dashboard_statement
+
+OWNER = 1
+
+# The filters behind the per-user routes; each must be answered from an index, never a table scan.
+HOT_QUERIES = {
+    "prompts list": (select(models.Prompt).where(models.Prompt.owner_id == OWNER), "ix_prompts_owner_id"),
+    "templates list": (select(models.Template).where(models.Template.owner_id == OWNER), "ix_templates_owner_id"),
+    "memory count": (
+        select(func.count()).select_from(models.MemoryEmbedding).where(models.MemoryEmbedding.owner_id == OWNER),
+        "ix_memory_embeddings_owner_id",
+    ),
+    "analytics dashboard": (dashboard_statement(OWNER), "ix_analytics_owner_event"),
+    "analytics export": (select(models.Analytics).where(models.Analytics.owner_id == OWNER), "ix_analytics_owner_event"),
+    "chat sessions": (
+        select(models.ChatHistory.session_id, func.min(models.ChatHistory.timestamp))
+        .where(models.ChatHistory.owner_id == OWNER)
+        .group_by(models.ChatHistory.session_id),
+        "ix_chat_history_owner_session_ts",
+    ),
+    "chat session history": (
+        select(models.ChatHistory)
+        .where(models.ChatHistory.owner_id == OWNER, models.ChatHistory.session_id == "s1")
+        .order_by(models.ChatHistory.timestamp.asc()),
+        "ix_chat_history_owner_session_ts",
+    ),
+    "chat session delete": (
+        delete(models.ChatHistory).where(models.ChatHistory.owner_id == OWNER, models.ChatHistory.session_id == "s1"),
+        "ix_chat_history_owner_session_ts",
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_index(engine, name):
+    statement, index_name = HOT_QUERIES[name]
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+    table_steps = [step for step in plan if step.startswith(("SCAN", "SEARCH"))]
+    assert table_steps, plan
+    for step in table_steps:
+        assert step.startswith("SEARCH"), f"{name} scans a table: {plan}"
+    # Match the whole index name so a sibling index sharing its prefix can't satisfy the check
+    assert any(re.search(rf"INDEX {index_name}\b", step) for step in table_steps), f"{name} does not use {index_name}: {plan}"
@@ -0,0 +1,89 @@
+# tests/test_session_memory.py
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services import session_memory as session_memory_module
+from app.services.session_memory import SessionMemoryStore
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """One token per word, so windows are easy to reason about (and no tokenizer is loaded)."""
+    monkeypatch.setattr(session_memory_module, "message_tokens", lambda message: len(message["content"].split()))
+
+
+def contents(store, owner_id, session_id):
+    return [m["content"] for m in store.get_messages(owner_id, session_id)]
+
+
+def test_window_slides_by_tokens(session_factory):
+    store = SessionMemoryStore(session_factory, max_tokens=6, buffer_size=50)
+    store.add_message(1, "s", "user", "one two three")
+    store.add_message(1, "s", "assistant", "four five")
+    store.add_message(1, "s", "user", "six seven")  # 7 tokens: the oldest message slides out
+
+    assert contents(store, 1, "s") == ["four five", "six seven"]
+    assert store.stats()["messages"] == 2
+
+    # The newest message is kept even when it alone exceeds the window
+    store.add_message(1, "s", "assistant", "a b c d e f g h")
+    assert contents(store, 1, "s") == ["a b c d e f g h"]
+    assert store.stats()["messages"] == 1
+
+
+def test_lru_eviction_keeps_message_total(session_factory):
+    store = SessionMemoryStore(session_factory, max_tokens=100, max_sessions=2)
+    store.add_message(1, "a", "user", "first")
+    store.add_message(1, "b", "user", "second")
+    store.add_message(1, "a", "user", "again")  # "b" is now the least recently used
+    store.add_message(1, "c", "user", "third")
+
+    stats = store.stats()
+    assert stats["sessions"] == 2
+    assert stats["lru_evictions"] == 1
+    assert stats["messages"] == 3  # "a" has two, "c" one; "b" went with its message
+
+    store = SessionMemoryStore(session_factory, max_tokens=100, max_total_messages=3)
+    store.add_message(1, "a", "user", "one")
+    store.add_message(1, "a", "user", "two")
+    store.add_message(1, "b", "user", "three")
+    store.add_message(1, "b", "user", "four")
+    assert store.stats()["sessions"] == 1
+    assert store.stats()["messages"] == 2
+
+
+def test_idle_sessions_are_evicted(session_factory):
+    store = SessionMemoryStore(session_factory, idle_ttl=0.05)
+    store.add_message(1, "old", "user", "hello")
+    time.sleep(0.1)
+    store.add_message(1, "new", "user", "hi")
+
+    stats = store.stats()
+    assert stats["sessions"] == 1
+    assert stats["idle_evictions"] == 1
+    assert stats["messages"] == 1
+
+
+def test_rehydrates_from_chat_history_and_drop(session_factory):
+    start = datetime(2026, 1, 1)
+    db = session_factory()
+    db.add_all([
+        models.ChatHistory(owner_id=1, session_id="s", prompt=f"q{i}", response=f"a{i}", timestamp=start + timedelta(minutes=i))
+        for i in (2, 0, 1)
+    ] + [models.ChatHistory(owner_id=2, session_id="s", prompt="other", response="user", timestamp=start)])
+    db.commit()
+    db.close()
+
+    store = SessionMemoryStore(session_factory, max_tokens=100, buffer_size=4)
+    # buffer_size=4 keeps the latest two turns, oldest first
+    assert contents(store, 1, "s") == ["q1", "a1", "q2", "a2"]
+    assert store.stats()["rehydrations"] == 1
+    assert contents(store, 1, "s") == ["q1", "a1", "q2", "a2"]
+    assert store.stats()["hits"] == 1
+
+    store.drop(1, "s")
+    assert store.stats()["sessions"] == 0
+    assert store.stats()["messages"] == 0
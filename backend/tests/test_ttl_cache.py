@@ -0,0 +1,59 @@
+# tests/test_ttl_cache.py
+from app.utils.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl=30, clock=clock)
+    cache.put("long", "x")
+    cache.put("short", "y", ttl=5)
+    cache.put("capped", "z", ttl=60)  # a per-entry ttl can shorten, never extend, the cache ttl
+
+    clock.now += 10
+    assert cache.get("short") is None
+    assert cache.get("long") == "x"
+    clock.now += 25
+    assert cache.get("long") is None
+    assert cache.get("capped") is None
+    assert cache.stats()["expirations"] == 3
+    assert len(cache) == 0
+
+
+def test_zero_ttl_disables_cache():
+    cache = TTLCache(max_entries=10, ttl=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_discard_where():
+    cache = TTLCache(max_entries=10)
+    for key, owner in [("t1", 1), ("t2", 2), ("t3", 1)]:
+        cache.put(key, owner)
+
+    assert cache.discard_where(lambda key, owner: owner == 1) == 2
+    assert cache.get("t2") == 2
+    assert cache.get("t1") is None and cache.get("t3") is None
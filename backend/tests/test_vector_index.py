@@ -0,0 +1,78 @@
+# tests/test_vector_index.py
+import os
+
+import numpy as np
+
+from app.utils.vector_index import VectorIndex, VECTORS_FILE, IDS_FILE
+
+DIM = 8
+
+
+def random_vectors(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype("float32") * 10 + 50
+
+
+def test_grows_past_initial_capacity():
+    vectors = random_vectors(50)
+    index = VectorIndex(DIM, initial_capacity=2)
+    for start in range(0, 50, 7):
+        index.add(vectors[start:start + 7], np.arange(start, min(start + 7, 50)))
+
+    assert len(index) == 50
+    stored, ids = index.arrays()
+    assert np.array_equal(stored, vectors)
+    assert ids.tolist() == list(range(50))
+
+
+def test_search_is_exact():
+    vectors = random_vectors(500)
+    index = VectorIndex(DIM)
+    index.add(vectors, np.arange(100, 600))
+
+    # The far-from-origin data makes ||x||^2 - 2x.q + ||q||^2 cancel badly in float32
+    distances, ids = index.search(vectors[42], k=5)
+    assert ids[0] == 142
+    assert distances[0] == 0.0
+
+    query = random_vectors(1, seed=1)[0]
+    expected = np.sqrt(((vectors.astype("float64") - query) ** 2).sum(axis=1))
+    order = np.argsort(expected)[:5]
+    distances, ids = index.search(query, k=5)
+    assert ids.tolist() == (order + 100).tolist()
+    assert np.allclose(distances, expected[order], atol=1e-4)
+
+    assert len(VectorIndex(DIM).search(query, k=3)[1]) == 0
+
+
+def test_snapshot_appends_and_reloads(tmp_path):
+    path = str(tmp_path / "shard")
+    vectors = random_vectors(20)
+    index = VectorIndex(DIM, path=path)
+    index.add(vectors[:12], np.arange(12))
+    index.add(vectors[12:], np.arange(12, 20))
+
+    reloaded = VectorIndex.load(path, DIM)
+    stored, ids = reloaded.arrays()
+    assert np.array_equal(stored, vectors)
+    assert ids.tolist() == list(range(20))
+
+    # Adds after a reload keep appending to the same snapshot
+    reloaded.add(vectors[:1], [99])
+    assert VectorIndex.load(path, DIM).arrays()[1].tolist() == list(range(20)) + [99]
+
+
+def test_load_truncates_torn_tail(tmp_path):
+    path = str(tmp_path / "shard")
+    vectors = random_vectors(3)
+    VectorIndex(DIM, path=path).add(vectors, [1, 2, 3])
+
+    # A crash mid-append: half a vector row, and an id with no vector at all
+    with open(os.path.join(path, VECTORS_FILE), "ab") as f:
+        f.write(b"\0" * (DIM * 2))
+    with open(os.path.join(path, IDS_FILE), "ab") as f:
+        f.write(np.array([4], dtype="int64").tobytes())
+
+    index = VectorIndex.load(path, DIM)
+    assert index.arrays()[1].tolist() == [1, 2, 3]
+    assert os.path.getsize(os.path.join(path, VECTORS_FILE)) == 3 * DIM * 4
+    assert os.path.getsize(os.path.join(path, IDS_FILE)) == 3 * 8
@@ -1,44 +1,268 @@
 # training/rag_indexer.py
+# Run from backend/ as: python -m training.rag_indexer [--index-type ...]
+import argparse
 import json
 import os
+import time
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
+from app.utils.passage_store import PassageWriter, OFFSETS_SUFFIX, BLOB_SUFFIX
 
 DATA_PATH = "training/alpaca_data.jsonl"
 INDEX_PATH = "training/faiss_index.index"
-TEXTS_PATH = "training/faiss_texts.json"
+PASSAGES_PATH = "training/faiss_passages"  # .offsets + .blob, read by app/services/rag_retriever.py
 
-def load_alpaca_data(path):
+# Build artifacts used while streaming; removed once the final index is written.
+# Both grow append-only, so a checkpoint costs a flush rather than a rewrite.
+PARTIAL_PASSAGES_PATH = PASSAGES_PATH + ".partial"
+CHECKPOINT_PATH = "training/rag_indexer.checkpoint.json"
+VECTORS_PATH = "training/faiss_vectors.f32"  # raw embeddings; the index is built from these at the end
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+DIM = 384  # MODEL_NAME's embedding size
+
+def iter_entries(path, skip=0):
+    """Yield (query, output) pairs lazily, skipping the first ``skip`` entries (blank lines aren't entries)."""
     with open(path, "r", encoding="utf-8") as f:
-        return [json.loads(line.strip()) for line in f]
+        for line in f:
+            if not line.strip():
+                continue
+            if skip > 0:
+                skip -= 1
+                continue
+            entry = json.loads(line)
+            query = entry["instruction"]
+            if entry["input"]:
+                query += " " + entry["input"]
+            yield query, entry["output"]
+
+def iter_batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def factory_string(index_type, nlist=1024, hnsw_m=32, pq_m=48, pq_nbits=8):
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m},Flat"
+    if index_type == "ivfpq":
+        return f"IVF{nlist},PQ{pq_m}x{pq_nbits}"
+    raise ValueError(f"Unknown index type '{index_type}'. Use one of {INDEX_TYPES}.")
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    """Apply nprobe (IVF) / efSearch (HNSW) to whichever index type this is; other types ignore them."""
+    params = faiss.ParameterSpace()
+    if nprobe is not None and faiss.try_extract_index_ivf(index) is not None:
+        params.set_index_parameter(index, "nprobe", nprobe)
+    if ef_search is not None and hasattr(faiss.downcast_index(index), "hnsw"):
+        params.set_index_parameter(index, "efSearch", ef_search)
+
+def new_index(dim, index_type="flat", nlist=1024, hnsw_m=32, ef_construction=200, pq_m=48, pq_nbits=8, **_):
+    index = faiss.index_factory(dim, factory_string(index_type, nlist, hnsw_m, pq_m, pq_nbits))
+    if hasattr(faiss.downcast_index(index), "hnsw"):
+        faiss.downcast_index(index).hnsw.efConstruction = ef_construction
+    return index
+
+def train_index(index, sample, index_type, **index_params):
+    """Train ``index`` on ``sample``, first rebuilding it with fewer IVF lists if the sample is too small."""
+    ivf = faiss.try_extract_index_ivf(index)
+    # IVF needs enough training points per list (and faiss refuses fewer points than lists)
+    nlist = max(1, len(sample) // 39)
+    if ivf is not None and ivf.nlist > nlist:
+        print(f"Only {len(sample)} training vectors; using nlist={nlist} instead of {ivf.nlist}.")
+        index = new_index(sample.shape[1], index_type, nlist=nlist, **index_params)
+    start = time.perf_counter()
+    index.train(sample)
+    print(f"Trained {index_type} index on {len(sample)} vectors in {time.perf_counter() - start:.1f}s")
+    return index
+
+def index_from_vectors(vectors, index_type="flat", nlist=1024, train_size=50000, chunk_size=100000, **index_params):
+    """Build the final index in one pass over ``vectors`` (a memmap), training on its first ``train_size`` rows."""
+    index = new_index(DIM, index_type, nlist=nlist, **index_params)
+    if not index.is_trained:
+        index = train_index(index, np.ascontiguousarray(vectors[:train_size]), index_type, **index_params)
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), chunk_size):
+        index.add(np.ascontiguousarray(vectors[offset:offset + chunk_size]))
+    print(f"Added {index.ntotal} vectors to the {index_type} index in {time.perf_counter() - start:.1f}s")
+    return index
+
+def exact_neighbours(queries, vectors, k, chunk_size=100000):
+    """Exact top-k over ``vectors`` (may be a memmap), scanned in chunks to bound memory."""
+    best_d = np.full((len(queries), 0), np.inf, dtype="float32")
+    best_i = np.empty((len(queries), 0), dtype="int64")
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.ascontiguousarray(vectors[start:start + chunk_size])
+        d, i = faiss.knn(queries, chunk, min(k, len(chunk)))
+        best_d = np.hstack([best_d, d])
+        best_i = np.hstack([best_i, i + start])
+        order = np.argsort(best_d, axis=1)[:, :k]
+        best_d = np.take_along_axis(best_d, order, axis=1)
+        best_i = np.take_along_axis(best_i, order, axis=1)
+    return best_i
+
+def recall_report(index, embeddings, k=10, n_queries=1000, nprobes=(1, 4, 16, 64), ef_searches=(16, 32, 64, 128), seed=0):
+    """Recall@k of ``index`` against exact (flat) search, with mean per-query latency."""
+    rng = np.random.default_rng(seed)
+    sample_ids = np.sort(rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False))
+    queries = np.ascontiguousarray(embeddings[sample_ids])
+    truth = exact_neighbours(queries, embeddings, k)
 
-def build_faiss_index():
-    data = load_alpaca_data(DATA_PATH)
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    if faiss.try_extract_index_ivf(index) is not None:
+        settings = [{"nprobe": n} for n in nprobes]
+    elif hasattr(faiss.downcast_index(index), "hnsw"):
+        settings = [{"ef_search": ef} for ef in ef_searches]
+    else:
+        settings = [{}]
 
-    embeddings = []
-    texts = []
+    rows = []
+    for setting in settings:
+        set_search_params(index, **setting)
+        latencies = []
+        found = 0
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            _, ids = index.search(query.reshape(1, -1), k)
+            latencies.append(time.perf_counter() - start)
+            found += len(set(ids[0]) & set(truth[i]))
+        rows.append({
+            **setting,
+            f"recall@{k}": round(found / (len(queries) * k), 4),
+            "mean_ms": round(1000 * float(np.mean(latencies)), 3),
+            "p99_ms": round(1000 * float(np.percentile(latencies, 99)), 3),
+        })
 
-    for entry in data:
-        query = entry["instruction"]
-        if entry["input"]:
-            query += " " + entry["input"]
+    for row in rows:
+        print("  ".join(f"{key}={value}" for key, value in row.items()))
+    return rows
 
-        emb = model.encode(query)
-        embeddings.append(emb)
-        texts.append(entry["output"])
+def load_checkpoint(params):
+    if not os.path.exists(CHECKPOINT_PATH):
+        return None
+    with open(CHECKPOINT_PATH, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("params") != params:
+        print("⚠️ Checkpoint was written with different settings; starting over.")
+        return None
+    return state
 
-    embeddings = np.array(embeddings).astype("float32")
+def save_checkpoint(params, entries, passages, vectors_file):
+    passages.flush()
+    vectors_file.flush()
+    state = {"params": params, "entries": entries}
+    with open(CHECKPOINT_PATH + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(CHECKPOINT_PATH + ".tmp", CHECKPOINT_PATH)
 
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
+def open_truncated(path, size):
+    """Open ``path`` for appending after cutting it back to ``size`` bytes (the last checkpoint)."""
+    f = open(path, "a+b")
+    f.truncate(size)
+    f.seek(size)
+    return f
+
+def build_faiss_index(index_type="flat", report=False, batch_size=512, workers=0, checkpoint_every=20,
+                      restart=False, **index_params):
+    # Streaming only embeds, so index settings can change between a crash and the resume
+    params = {"model": MODEL_NAME, "data": DATA_PATH}
+    state = None if restart else load_checkpoint(params)
+    done = state["entries"] if state else 0
+
+    passages = PassageWriter(PARTIAL_PASSAGES_PATH)
+    passages.truncate(done)
+    vectors_file = open_truncated(VECTORS_PATH, done * DIM * 4)
+    if done:
+        print(f"↻ Resuming from checkpoint at entry {done}.")
+
+    model = SentenceTransformer(MODEL_NAME)
+    pool = model.start_multi_process_pool(["cpu"] * workers) if workers > 1 else None
+
+    start = time.perf_counter()
+    processed = 0
+    try:
+        for batch_no, batch in enumerate(iter_batches(iter_entries(DATA_PATH, skip=done), batch_size), start=1):
+            queries = [query for query, _ in batch]
+            if pool is not None:
+                embeddings = model.encode_multi_process(queries, pool, batch_size=batch_size)
+            else:
+                embeddings = model.encode(queries, batch_size=batch_size, convert_to_numpy=True)
+            embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+
+            vectors_file.write(embeddings.tobytes())
+            passages.add(output for _, output in batch)
+            done += len(batch)
+            processed += len(batch)
+
+            if batch_no % checkpoint_every == 0:
+                save_checkpoint(params, done, passages, vectors_file)
+                rate = processed / (time.perf_counter() - start)
+                print(f"… {done} entries embedded ({rate:.0f} entries/sec)")
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+        passages.close()
+        vectors_file.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Embedded {processed} entries in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.0f} entries/sec)")
+    if done == 0:
+        print(f"❌ No entries found in {DATA_PATH}; nothing to index.")
+        return
+
+    vectors = np.memmap(VECTORS_PATH, dtype="float32", mode="r", shape=(done, DIM))
+    index = index_from_vectors(vectors, index_type, **index_params)
+    if report:
+        recall_report(index, vectors)
+    del vectors
 
     faiss.write_index(index, INDEX_PATH)
-    with open(TEXTS_PATH, "w", encoding="utf-8") as f:
-        json.dump(texts, f, indent=2)
+    # Passage i is the output for FAISS id i
+    for suffix in (OFFSETS_SUFFIX, BLOB_SUFFIX):
+        os.replace(PARTIAL_PASSAGES_PATH + suffix, PASSAGES_PATH + suffix)
 
-    print(f"✅ FAISS index built with {len(texts)} entries.")
+    for path in (CHECKPOINT_PATH, VECTORS_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+
+    print(f"✅ FAISS {index_type} index built with {index.ntotal} entries.")
 
 if __name__ == "__main__":
-    build_faiss_index()
+    parser = argparse.ArgumentParser(description="Build the RAG FAISS index over the Alpaca dataset.")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=os.getenv("RAG_INDEX_TYPE", "flat"))
+    parser.add_argument("--nlist", type=int, default=1024, help="IVF inverted lists")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW neighbours per node")
+    parser.add_argument("--ef-construction", type=int, default=200, help="HNSW build-time search depth")
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ sub-quantizers (must divide the dimension)")
+    parser.add_argument("--pq-nbits", type=int, default=8, help="bits per PQ code")
+    parser.add_argument("--train-size", type=int, default=50000, help="vectors sampled to train IVF/PQ")
+    parser.add_argument("--batch-size", type=int, default=512, help="entries encoded per batch")
+    parser.add_argument("--workers", type=int, default=0, help="encode across this many CPU worker processes")
+    parser.add_argument("--checkpoint-every", type=int, default=20, help="batches between resumable checkpoints")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--report", action="store_true", help="print recall@10 and latency against a flat index")
+    args = parser.parse_args()
+
+    build_faiss_index(
+        index_type=args.index_type,
+        report=args.report,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_every=args.checkpoint_every,
+        restart=args.restart,
+        nlist=args.nlist,
+        hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction,
+        pq_m=args.pq_m,
+        pq_nbits=args.pq_nbits,
+        train_size=args.train_size,
+    )